@@ -9,6 +9,58 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to indented JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+
+class ConfigSnapshot:
+    """
+    Immutable view of the scan-relevant configuration.
+
+    Obtain one via `ConfigManager.snapshot()` before a file walk and use it
+    for the per-file checks, so the hot loop never touches the manager's
+    cache bookkeeping.
+    """
+
+    __slots__ = ('exclude_dirs', 'exclude_substrings', 'extensions', 'base_path')
+
+    def __init__(self, exclude_dirs: frozenset, exclude_substrings: tuple,
+                 extensions: frozenset, base_path: str):
+        self.exclude_dirs = exclude_dirs
+        self.exclude_substrings = exclude_substrings
+        self.extensions = extensions
+        self.base_path = base_path
+
+    def should_exclude(self, path: Path) -> bool:
+        """Check if a path should be excluded from indexing."""
+        if self.exclude_dirs.intersection(path.parts):
+            return True
+        name = path.name
+        for substring in self.exclude_substrings:
+            if substring in name:
+                return True
+        return False
+
+    def is_valid_extension(self, path: Path) -> bool:
+        """Check if a file has a valid extension for indexing."""
+        return path.suffix.lower() in self.extensions
+
 
 class ConfigManager:
     """
@@ -53,28 +105,51 @@ class ConfigManager:
         """
         self.config_dir = Path(config_path)
         self.config_file = self.config_dir / "config.json"
-        
+
+        # Cached parsed config, invalidated when the file's mtime changes
+        self._config: Optional[Dict[str, Any]] = None
+        self._config_mtime: float = 0
+
+        # Precompiled exclusion matcher, rebuilt when the config changes
+        self._exclude_dirs: frozenset = frozenset()
+        self._exclude_substrings: tuple = ()
+        self._exclude_mtime: Optional[float] = None
+
+        # Cached extension set for O(1) suffix checks
+        self._file_extensions: frozenset = frozenset()
+        self._extensions_mtime: Optional[float] = None
+
         # Ensure config directory exists
         self.config_dir.mkdir(parents=True, exist_ok=True)
-    
+
     def load_config(self) -> Dict[str, Any]:
         """
         Load configuration from file or return defaults.
-        
+
+        The parsed config is cached in memory and only re-read when the
+        file's mtime changes, so per-file helpers like `should_exclude`
+        don't trigger a JSON parse on every call.
+
         Returns:
             Configuration dictionary
         """
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                st = self.config_file.stat()
+                if self._config is not None and st.st_mtime == self._config_mtime:
+                    return self._config
+
+                with open(self.config_file, 'rb') as f:
+                    config = _loads(f.read())
                     # Merge with defaults to handle new fields
                     merged = {**self.DEFAULT_CONFIG, **config}
+                    self._config = merged
+                    self._config_mtime = st.st_mtime
                     return merged
-            except (json.JSONDecodeError, IOError) as e:
+            except (ValueError, IOError, OSError) as e:
                 print(f"Warning: Could not load config file: {e}")
                 return self.DEFAULT_CONFIG.copy()
-        
+
         # Return default config if file doesn't exist
         return self.DEFAULT_CONFIG.copy()
     
@@ -89,17 +164,28 @@ class ConfigManager:
             True if saved successfully, False otherwise
         """
         try:
-            # Load existing config and merge
+            # Merge with the (cached) existing config
             existing = self.load_config()
             merged = {**existing, **config}
             merged["updated_at"] = datetime.now().isoformat()
-            
+
             if not merged.get("created_at"):
                 merged["created_at"] = merged["updated_at"]
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(merged, f, indent=2)
-            
+
+            # Write to a tempfile and rename so a crash mid-write can't
+            # leave a truncated config behind
+            tmp_file = self.config_file.with_name(self.config_file.name + ".tmp")
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(merged))
+            os.replace(tmp_file, self.config_file)
+
+            # Refresh the cache so subsequent loads don't re-read the file
+            self._config = merged
+            try:
+                self._config_mtime = self.config_file.stat().st_mtime
+            except OSError:
+                self._config_mtime = 0
+
             return True
         except IOError as e:
             print(f"Error saving config: {e}")
@@ -164,31 +250,45 @@ class ConfigManager:
         config = self.load_config()
         return config.get("file_extensions", self.DEFAULT_CONFIG["file_extensions"])
     
+    def _build_exclude_matcher(self):
+        """Split excluded patterns into a name set and wildcard substrings."""
+        exclude_dirs = set()
+        exclude_substrings = []
+        for pattern in self.get_excluded_patterns():
+            if pattern.startswith("*"):
+                exclude_substrings.append(pattern[1:])
+            else:
+                exclude_dirs.add(pattern)
+        self._exclude_dirs = frozenset(exclude_dirs)
+        self._exclude_substrings = tuple(exclude_substrings)
+        self._exclude_mtime = self._config_mtime
+
     def should_exclude(self, path: Path) -> bool:
         """
         Check if a path should be excluded from indexing.
-        
+
+        Uses a precompiled matcher (set of directory names plus wildcard
+        substrings) instead of scanning every pattern per call.
+
         Args:
             path: Path to check
-            
+
         Returns:
             True if the path should be excluded
         """
-        path_str = str(path)
-        patterns = self.get_excluded_patterns()
-        
-        for pattern in patterns:
-            if pattern.startswith("*"):
-                # Wildcard pattern
-                if pattern[1:] in path_str:
-                    return True
-            else:
-                # Directory name pattern
-                if f"/{pattern}/" in path_str or f"\\{pattern}\\" in path_str:
-                    return True
-                if path_str.endswith(f"/{pattern}") or path_str.endswith(f"\\{pattern}"):
-                    return True
-        
+        if self._exclude_mtime != self._config_mtime or self._exclude_mtime is None:
+            self._build_exclude_matcher()
+
+        # Directory name patterns: one set intersection against path components
+        if self._exclude_dirs.intersection(path.parts):
+            return True
+
+        # Wildcard patterns like "*.generated.*" match against the file name
+        name = path.name
+        for substring in self._exclude_substrings:
+            if substring in name:
+                return True
+
         return False
     
     def is_valid_extension(self, path: Path) -> bool:
@@ -201,9 +301,31 @@ class ConfigManager:
         Returns:
             True if the file should be indexed
         """
-        extensions = self.get_file_extensions()
-        return path.suffix.lower() in extensions
+        if self._extensions_mtime != self._config_mtime or self._extensions_mtime is None:
+            self._file_extensions = frozenset(
+                ext.lower() for ext in self.get_file_extensions()
+            )
+            self._extensions_mtime = self._config_mtime
+        return path.suffix.lower() in self._file_extensions
     
+    def snapshot(self) -> ConfigSnapshot:
+        """
+        Build an immutable snapshot of the scan-relevant settings.
+
+        Returns:
+            ConfigSnapshot with precomputed exclusion and extension sets
+        """
+        config = self.load_config()
+        if self._exclude_mtime != self._config_mtime or self._exclude_mtime is None:
+            self._build_exclude_matcher()
+        return ConfigSnapshot(
+            exclude_dirs=self._exclude_dirs,
+            exclude_substrings=self._exclude_substrings,
+            extensions=frozenset(ext.lower() for ext in config.get(
+                "file_extensions", self.DEFAULT_CONFIG["file_extensions"])),
+            base_path=str(config.get("base_path", "/host"))
+        )
+
     def get_index_status_file(self) -> Path:
         """Get path to index status file."""
         return self.config_dir / "index_status.json"
@@ -220,8 +342,8 @@ class ConfigManager:
         """
         try:
             status_file = self.get_index_status_file()
-            with open(status_file, 'w', encoding='utf-8') as f:
-                json.dump(status, f, indent=2)
+            with open(status_file, 'wb') as f:
+                f.write(_dumps(status))
             return True
         except IOError as e:
             print(f"Error saving index status: {e}")
@@ -237,9 +359,9 @@ class ConfigManager:
         status_file = self.get_index_status_file()
         if status_file.exists():
             try:
-                with open(status_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
+                with open(status_file, 'rb') as f:
+                    return _loads(f.read())
+            except (ValueError, IOError):
                 pass
         
         return {
@@ -37,7 +37,35 @@ class CrashDumpAnalyzer:
             # Exception messages
             r'(?:Exception|Error):\s*(.+)',
         ]
-    
+
+        # Fused frame pattern so the whole trace is scanned in one pass.
+        # Track where each alternative's subgroups land in the combined regex
+        # so the per-pattern group layout can be recovered from a match.
+        parts = []
+        self._frame_group_spans = []
+        next_group = 1
+        for i, pattern in enumerate(self.stack_frame_patterns):
+            parts.append(f"(?P<p{i}>{pattern})")
+            n_groups = re.compile(pattern).groups
+            self._frame_group_spans.append((next_group + 1, next_group + 1 + n_groups))
+            next_group += 1 + n_groups
+        self.frame_re = re.compile("|".join(parts), re.IGNORECASE)
+        # Fuse error patterns into one alternation with named groups so each
+        # line is scanned in a single pass; map group name back to its pattern
+        self.error_re = re.compile(
+            "|".join(
+                f"(?P<g{i}>{p.replace('(.+)', '.+')})"
+                for i, p in enumerate(self.error_patterns)
+            ),
+            re.IGNORECASE
+        )
+        # Fused variable-extraction pattern: [var] = value wins over the
+        # plain var = value / var: value forms, scanned in a single pass
+        self.var_re = re.compile(
+            r'\[([a-zA-Z_][a-zA-Z0-9_]*)\]\s*=\s*([^\n]+)'
+            r'|([a-zA-Z_][a-zA-Z0-9_]*)\s*[=:]\s*([^\n]+)'
+        )
+
     def parse_stack_trace(self, stack_trace: str) -> List[Dict[str, Any]]:
         """
         Parse a stack trace and extract function names, files, and line numbers
@@ -49,33 +77,39 @@ class CrashDumpAnalyzer:
         - module: DLL/EXE name (if available)
         """
         frames = []
-        lines = stack_trace.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
+        prev_line_start = -1
+
+        # One pass over the whole buffer; at most one frame per line
+        for match in self.frame_re.finditer(stack_trace):
+            line_start = stack_trace.rfind('\n', 0, match.start()) + 1
+            if line_start == prev_line_start:
                 continue
-            
-            # Try each pattern
-            for pattern in self.stack_frame_patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    groups = match.groups()
-                    frame = {'raw': line}
-                    
-                    if len(groups) == 2:
-                        # module!function or dll!namespace::function
-                        frame['module'] = groups[0]
-                        frame['function'] = groups[1]
-                    elif len(groups) == 3:
-                        # function at file:line
-                        frame['function'] = groups[0]
-                        frame['file'] = groups[1]
-                        frame['line'] = int(groups[2])
-                    
-                    frames.append(frame)
+            prev_line_start = line_start
+
+            line_end = stack_trace.find('\n', match.end())
+            if line_end == -1:
+                line_end = len(stack_trace)
+
+            # Recover which alternative matched and its subgroups
+            for i, (group_start, group_end) in enumerate(self._frame_group_spans):
+                if match.group(f"p{i}") is not None:
+                    groups = match.groups()[group_start - 1:group_end - 1]
                     break
-        
+
+            frame = {'raw': stack_trace[line_start:line_end].strip()}
+
+            if len(groups) == 2:
+                # module!function or dll!namespace::function
+                frame['module'] = groups[0]
+                frame['function'] = groups[1]
+            elif len(groups) == 3:
+                # function at file:line
+                frame['function'] = groups[0]
+                frame['file'] = groups[1]
+                frame['line'] = int(groups[2])
+
+            frames.append(frame)
+
         return frames
     
     def extract_error_context(self, log_text: str) -> Dict[str, Any]:
@@ -87,29 +121,30 @@ class CrashDumpAnalyzer:
         - error_message: the actual error message
         - context_lines: surrounding log lines
         """
-        lines = log_text.split('\n')
         error_info = {
             'error_type': 'unknown',
             'error_message': '',
             'context_lines': []
         }
-        
-        for i, line in enumerate(lines):
-            # Check for error patterns
-            for pattern in self.error_patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    error_info['error_type'] = pattern.split('|')[0].strip('(?:')
-                    error_info['error_message'] = match.group(0)
-                    
-                    # Extract context (5 lines before and after)
-                    start = max(0, i - 5)
-                    end = min(len(lines), i + 6)
-                    error_info['context_lines'] = lines[start:end]
-                    error_info['error_line_index'] = i - start
-                    
-                    return error_info
-        
+
+        # Single C-level scan over the whole buffer; only split into lines
+        # once a match is found
+        match = self.error_re.search(log_text)
+        if not match:
+            return error_info
+
+        pattern = self.error_patterns[int(match.lastgroup[1:])]
+        error_info['error_type'] = pattern.split('|')[0].strip('(?:')
+        error_info['error_message'] = match.group(0)
+
+        # Extract context (5 lines before and after)
+        lines = log_text.split('\n')
+        i = log_text.count('\n', 0, match.start())
+        start = max(0, i - 5)
+        end = min(len(lines), i + 6)
+        error_info['context_lines'] = lines[start:end]
+        error_info['error_line_index'] = i - start
+
         return error_info
     
     def extract_variable_values(self, log_text: str) -> Dict[str, str]:
@@ -122,23 +157,16 @@ class CrashDumpAnalyzer:
         - [variable] = value
         """
         variables = {}
-        
-        patterns = [
-            r'([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*([^\n]+)',
-            r'([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*([^\n]+)',
-            r'\[([a-zA-Z_][a-zA-Z0-9_]*)\]\s*=\s*([^\n]+)',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, log_text)
-            for match in matches:
-                var_name = match.group(1)
-                var_value = match.group(2).strip()
-                
-                # Filter out non-interesting values
-                if var_value and len(var_value) < 200:
-                    variables[var_name] = var_value
-        
+
+        # One pass over the buffer instead of one scan per pattern
+        for match in self.var_re.finditer(log_text):
+            var_name = match.group(1) or match.group(3)
+            var_value = (match.group(2) or match.group(4)).strip()
+
+            # Filter out non-interesting values
+            if var_value and len(var_value) < 200:
+                variables[var_name] = var_value
+
         return variables
 
 
@@ -204,7 +232,7 @@ async def analyze_crash_dump(dump_text: str, log_text: str, db_pool, embedding_m
                     FROM files f
                     LEFT JOIN entities e ON e.file_id = f.id
                     LEFT JOIN code_chunks c ON c.file_id = f.id
-                    WHERE f.path LIKE $1 AND e.start_line <= $2 AND e.end_line >= $2
+                    WHERE f.path_posix LIKE $1 AND e.start_line <= $2 AND e.end_line >= $2
                     ORDER BY e.id
                     LIMIT 1
                 """, f"%{Path(frame['file']).name}%", frame.get('line', 0))
@@ -301,8 +329,8 @@ async def find_code_at_location(file_path: str, line_number: int, db_pool) -> Op
             FROM entities e
             JOIN files f ON e.file_id = f.id
             LEFT JOIN code_chunks c ON c.entity_id = e.id
-            WHERE f.path LIKE $1 
-              AND e.start_line <= $2 
+            WHERE f.path_posix LIKE $1
+              AND e.start_line <= $2
               AND e.end_line >= $2
             ORDER BY (e.end_line - e.start_line) ASC  -- Smallest enclosing entity
             LIMIT 1
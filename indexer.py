@@ -4,154 +4,281 @@ Handles incremental updates and relationship resolution
 """
 
 import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 import json
 
 import asyncpg
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from parser import parse_cpp_file, Entity, Relationship, CodeChunk
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Digest used for change detection only, so cryptographic strength is
+# wasted cycles; xxh3 hashes an order of magnitude faster than SHA-256.
+# HASH_ALGO=sha256 keeps digests comparable with rows written before the
+# switch (at the cost of one full re-index when flipping back)
+_HASH_ALGO = os.getenv("HASH_ALGO", "xxh3" if xxhash is not None else "sha256")
+
+
+def content_hash(data: bytes) -> str:
+    """Digest file content for change detection (not a security hash)"""
+    if _HASH_ALGO == "xxh3" and xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+# Worker processes for tree-sitter parsing and entity extraction, which
+# are CPU-bound and GIL-held; created lazily so importing this module
+# (e.g. in the workers themselves) doesn't spawn a pool
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """Lazily create the shared parser process pool"""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _parse_pool
+
+
+def _read_file_content(file_path: Path) -> Tuple[str, str]:
+    """Blocking file read, run in a worker thread.
+
+    Reads bytes once, hashing them before decoding so we never re-encode
+    the decoded string just to compute the content hash.
+    """
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    raw_hash = content_hash(raw)
+    return raw.decode('utf-8', errors='ignore'), raw_hash
+
 
 class CodeIndexer:
     """Handles indexing of C++ code files"""
-    
+
+    # Cap on cached entity resolutions; oldest entries are evicted first
+    CACHE_MAX_ENTRIES = 50000
+
     def __init__(self, db_pool: asyncpg.Pool, embedding_model: SentenceTransformer):
         self.db_pool = db_pool
         self.embedding_model = embedding_model
-        self.entity_cache: Dict[str, int] = {}  # qualified_name -> entity_id
-    
-    async def index_file(self, file_path: Path, file_id: int, content: str):
-        """Index a single file completely"""
+        # Bounded LRU caches: qualified_name -> entity_id and
+        # simple_name -> entity_id (most recent resolution wins)
+        self.qname_cache: OrderedDict = OrderedDict()
+        self.sname_cache: OrderedDict = OrderedDict()
+
+    def _cache_put(self, cache: OrderedDict, key: str, value: int):
+        """Insert into an LRU cache, evicting the oldest entry when full"""
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > self.CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
+    async def _embed_texts(self, texts: List[str]):
+        """Batch-encode texts in a worker thread so the model's forward
+        pass doesn't block the event loop"""
+        return await asyncio.to_thread(
+            self.embedding_model.encode,
+            texts,
+            batch_size=64,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+
+    async def index_file(self, conn: asyncpg.Connection, file_path: Path,
+                         file_id: int, content: str):
+        """Index a single file completely on the given connection"""
         
-        # Parse the file
+        # Parse the file in a worker process; extraction holds the GIL, so
+        # this is what lets indexing use more than one core
         try:
-            entities, relationships, chunks = parse_cpp_file(file_path, content)
+            entities, relationships, chunks = await asyncio.get_running_loop().run_in_executor(
+                _get_parse_pool(), parse_cpp_file, file_path, content
+            )
         except Exception as e:
             print(f"Parse error for {file_path}: {e}")
             # Fall back to simple chunking
-            await self._simple_file_indexing(file_id, content)
+            await self._simple_file_indexing(conn, file_id, content)
             return
         
-        async with self.db_pool.acquire() as conn:
-            async with conn.transaction():
-                # Delete old entities for this file (cascade will handle chunks and relationships)
-                await conn.execute("DELETE FROM entities WHERE file_id = $1", file_id)
-                
-                # Insert entities
-                entity_map = {}  # temporary qualified_name -> db_id mapping
-                for entity in entities:
-                    entity_id = await self._insert_entity(conn, file_id, entity)
-                    entity_map[entity.qualified_name] = entity_id
-                    self.entity_cache[entity.qualified_name] = entity_id
-                
-                # Resolve parent relationships
-                for entity in entities:
-                    if "::" in entity.qualified_name:
-                        # Try to find parent
-                        parts = entity.qualified_name.rsplit("::", 1)
-                        if len(parts) == 2:
-                            parent_name = parts[0]
-                            if parent_name in entity_map:
-                                await conn.execute(
-                                    "UPDATE entities SET parent_id = $1 WHERE id = $2",
-                                    entity_map[parent_name],
-                                    entity_map[entity.qualified_name]
-                                )
-                
-                # Insert relationships
-                for rel in relationships:
-                    await self._insert_relationship(conn, rel, entity_map, file_id)
-                
-                # Insert chunks with embeddings
-                for chunk in chunks:
-                    await self._insert_chunk(conn, chunk, entity_map, file_id)
-                
-                # Update file status
-                await conn.execute(
-                    "UPDATE files SET status = 'indexed', last_indexed = $1 WHERE id = $2",
-                    datetime.now(timezone.utc),
-                    file_id
+        # Encode all chunks in one batched forward pass instead of per-chunk
+        chunk_embeddings = []
+        if chunks:
+            chunk_embeddings = await self._embed_texts(
+                [chunk.content for chunk in chunks]
+            )
+
+        async with conn.transaction():
+            # Delete old entities for this file (cascade will handle chunks and relationships)
+            await conn.execute("DELETE FROM entities WHERE file_id = $1", file_id)
+            
+            # Insert all entities in one multi-row statement
+            entity_map = await self._insert_entities(conn, file_id, entities)
+            for qualified_name, entity_id in entity_map.items():
+                self._cache_put(self.qname_cache, qualified_name, entity_id)
+                self._cache_put(self.sname_cache, qualified_name.split("::")[-1], entity_id)
+            
+            # Resolve parent relationships in one batched statement
+            parent_updates = []
+            for entity in entities:
+                if "::" in entity.qualified_name:
+                    # Try to find parent
+                    parent_name = entity.qualified_name.rsplit("::", 1)[0]
+                    if parent_name in entity_map:
+                        parent_updates.append(
+                            (entity_map[parent_name], entity_map[entity.qualified_name])
+                        )
+
+            if parent_updates:
+                await conn.executemany(
+                    "UPDATE entities SET parent_id = $1 WHERE id = $2",
+                    parent_updates
                 )
-        
+            
+            # Pre-resolve to_entity names that miss both maps in one query,
+            # instead of a SELECT per unresolved relationship
+            unresolved = {
+                simple_name
+                for rel in relationships
+                if rel.relationship_type != "includes"
+                and rel.to_entity not in entity_map
+                and rel.to_entity not in self.qname_cache
+                and (simple_name := rel.to_entity.split("::")[-1]) not in self.sname_cache
+            }
+            simple_name_map = {}
+            if unresolved:
+                rows = await conn.fetch("""
+                    SELECT DISTINCT ON (simple_name) id, simple_name
+                    FROM entities
+                    WHERE simple_name = ANY($1::text[])
+                """, list(unresolved))
+                simple_name_map = {row["simple_name"]: row["id"] for row in rows}
+                # Remember SQL resolutions so the same symbol doesn't miss again
+                for simple_name, entity_id in simple_name_map.items():
+                    self._cache_put(self.sname_cache, simple_name, entity_id)
+
+            # Resolve relationship endpoints, then insert them in one batch
+            rel_records = []
+            for rel in relationships:
+                record = self._resolve_relationship(rel, entity_map, simple_name_map)
+                if record:
+                    rel_records.append(record)
+
+            if rel_records:
+                await conn.copy_records_to_table(
+                    "relationships",
+                    records=rel_records,
+                    columns=["from_entity_id", "to_entity_id",
+                             "relationship_type", "context", "line_number"]
+                )
+
+            # Insert chunks with their precomputed embeddings in one batch
+            chunk_records = []
+            for chunk, embedding in zip(chunks, chunk_embeddings):
+                entity_id = entity_map.get(chunk.entity_name) if chunk.entity_name else None
+                chunk_records.append((
+                    entity_id, file_id, chunk.chunk_type, chunk.content,
+                    chunk.start_line, chunk.end_line,
+                    np.asarray(embedding, dtype=np.float32),
+                    json.dumps(chunk.metadata)
+                ))
+
+            if chunk_records:
+                await conn.copy_records_to_table(
+                    "code_chunks",
+                    records=chunk_records,
+                    columns=["entity_id", "file_id", "chunk_type", "content",
+                             "start_line", "end_line", "embedding", "metadata"]
+                )
+            
+            # Update file status
+            await conn.execute(
+                "UPDATE files SET status = 'indexed', last_indexed = $1 WHERE id = $2",
+                datetime.now(timezone.utc),
+                file_id
+            )
+    
         print(f"Indexed {file_path}: {len(entities)} entities, {len(relationships)} relationships, {len(chunks)} chunks")
     
-    async def _insert_entity(self, conn: asyncpg.Connection, file_id: int, entity: Entity) -> int:
-        """Insert an entity and return its ID"""
-        entity_id = await conn.fetchval("""
+    async def _insert_entities(self, conn: asyncpg.Connection, file_id: int,
+                               entities: List[Entity]) -> Dict[str, int]:
+        """Insert all entities in one statement and return name -> id mapping"""
+        if not entities:
+            return {}
+
+        rows = await conn.fetch("""
             INSERT INTO entities (
                 file_id, type, qualified_name, simple_name, signature,
                 start_line, end_line, complexity_score, is_public, metadata
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            RETURNING id
-        """, file_id, entity.type, entity.qualified_name, entity.simple_name,
-            entity.signature, entity.start_line, entity.end_line,
-            entity.complexity_score, entity.is_public, json.dumps(entity.metadata))
-        
-        return entity_id
-    
-    async def _insert_relationship(self, conn: asyncpg.Connection, rel: Relationship,
-                                   entity_map: Dict[str, int], file_id: int):
-        """Insert a relationship between entities"""
-        
+            )
+            SELECT $1, t.type, t.qualified_name, t.simple_name, t.signature,
+                   t.start_line, t.end_line, t.complexity_score, t.is_public, t.metadata
+            FROM unnest(
+                $2::text[], $3::text[], $4::text[], $5::text[],
+                $6::int[], $7::int[], $8::int[], $9::bool[], $10::jsonb[]
+            ) AS t(type, qualified_name, simple_name, signature,
+                   start_line, end_line, complexity_score, is_public, metadata)
+            RETURNING id, qualified_name
+        """, file_id,
+            [e.type for e in entities],
+            [e.qualified_name for e in entities],
+            [e.simple_name for e in entities],
+            [e.signature for e in entities],
+            [e.start_line for e in entities],
+            [e.end_line for e in entities],
+            [e.complexity_score for e in entities],
+            [e.is_public for e in entities],
+            [json.dumps(e.metadata) for e in entities])
+
+        return {row["qualified_name"]: row["id"] for row in rows}
+
+    def _resolve_relationship(self, rel: Relationship, entity_map: Dict[str, int],
+                              simple_name_map: Dict[str, int]) -> Optional[tuple]:
+        """Resolve a relationship's endpoints to entity ids, or None if unresolvable"""
+
+        # For includes, we don't have a from_entity (file-level)
+        if rel.relationship_type == "includes":
+            # Just store as metadata for now
+            return None
+
         # Resolve from_entity
         from_id = None
         if rel.from_entity in entity_map:
             from_id = entity_map[rel.from_entity]
-        elif rel.from_entity in self.entity_cache:
-            from_id = self.entity_cache[rel.from_entity]
-        
-        # For includes, we don't have a from_entity (file-level)
-        if rel.relationship_type == "includes":
-            # Just store as metadata for now
-            return
-        
+        elif rel.from_entity in self.qname_cache:
+            from_id = self.qname_cache[rel.from_entity]
+
         # Resolve to_entity
         to_id = None
         if rel.to_entity in entity_map:
             to_id = entity_map[rel.to_entity]
-        elif rel.to_entity in self.entity_cache:
-            to_id = self.entity_cache[rel.to_entity]
+        elif rel.to_entity in self.qname_cache:
+            to_id = self.qname_cache[rel.to_entity]
         else:
-            # Try to find by simple name (less precise)
+            # Fall back to simple-name resolution (less precise)
             simple_name = rel.to_entity.split("::")[-1]
-            to_id = await conn.fetchval(
-                "SELECT id FROM entities WHERE simple_name = $1 LIMIT 1",
-                simple_name
-            )
-        
-        # Only insert if we could resolve both entities
+            to_id = simple_name_map.get(simple_name)
+            if to_id is None:
+                to_id = self.sname_cache.get(simple_name)
+
+        # Only keep relationships where both endpoints resolved
         if from_id and to_id:
-            await conn.execute("""
-                INSERT INTO relationships (
-                    from_entity_id, to_entity_id, relationship_type, context, line_number
-                ) VALUES ($1, $2, $3, $4, $5)
-                ON CONFLICT DO NOTHING
-            """, from_id, to_id, rel.relationship_type, rel.context, rel.line_number)
+            return (from_id, to_id, rel.relationship_type, rel.context, rel.line_number)
+        return None
     
-    async def _insert_chunk(self, conn: asyncpg.Connection, chunk: CodeChunk,
-                           entity_map: Dict[str, int], file_id: int):
-        """Insert a code chunk with its embedding"""
-        
-        # Generate embedding
-        embedding = self.embedding_model.encode(chunk.content).tolist()
-        embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-        
-        # Resolve entity_id
-        entity_id = None
-        if chunk.entity_name and chunk.entity_name in entity_map:
-            entity_id = entity_map[chunk.entity_name]
-        
-        await conn.execute("""
-            INSERT INTO code_chunks (
-                entity_id, file_id, chunk_type, content, start_line, end_line, embedding, metadata
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7::vector, $8)
-        """, entity_id, file_id, chunk.chunk_type, chunk.content,
-            chunk.start_line, chunk.end_line, embedding_str, json.dumps(chunk.metadata))
-    
-    async def _simple_file_indexing(self, file_id: int, content: str):
+    async def _simple_file_indexing(self, conn: asyncpg.Connection,
+                                    file_id: int, content: str):
         """Fallback: simple chunking when parsing fails"""
         lines = content.splitlines()
         
@@ -159,67 +286,101 @@ class CodeIndexer:
         chunk_size = 100
         overlap = 20
         
-        async with self.db_pool.acquire() as conn:
-            for i in range(0, len(lines), chunk_size - overlap):
-                chunk_lines = lines[i:i + chunk_size]
-                chunk_text = "\n".join(chunk_lines)
-                
-                if len(chunk_text.strip()) < 50:  # Skip tiny chunks
-                    continue
-                
-                embedding = self.embedding_model.encode(chunk_text).tolist()
-                embedding_str = '[' + ','.join(map(str, embedding)) + ']'
-                
-                await conn.execute("""
-                    INSERT INTO code_chunks (
-                        file_id, chunk_type, content, start_line, end_line, embedding, metadata
-                    ) VALUES ($1, 'mixed', $2, $3, $4, $5::vector, $6)
-                """, file_id, chunk_text, i + 1, i + len(chunk_lines),
-                    embedding_str, json.dumps({"fallback": True}))
+        # Collect all chunks first so they can be encoded in one batch
+        chunk_records = []
+        for i in range(0, len(lines), chunk_size - overlap):
+            chunk_lines = lines[i:i + chunk_size]
+            chunk_text = "\n".join(chunk_lines)
+
+            if len(chunk_text.strip()) < 50:  # Skip tiny chunks
+                continue
+
+            chunk_records.append((chunk_text, i + 1, i + len(chunk_lines)))
+
+        if not chunk_records:
+            return
+
+        embeddings = await self._embed_texts(
+            [text for text, _, _ in chunk_records]
+        )
+
+        metadata = json.dumps({"fallback": True})
+        records = [
+            (file_id, "mixed", chunk_text, start_line, end_line,
+             np.asarray(embedding, dtype=np.float32), metadata)
+            for (chunk_text, start_line, end_line), embedding in zip(chunk_records, embeddings)
+        ]
+
+        await conn.copy_records_to_table(
+            "code_chunks",
+            records=records,
+            columns=["file_id", "chunk_type", "content",
+                     "start_line", "end_line", "embedding", "metadata"]
+        )
 
 
 async def batch_index_files(file_paths: List[Path], db_pool: asyncpg.Pool,
                             embedding_model: SentenceTransformer):
     """Index multiple files in parallel"""
     indexer = CodeIndexer(db_pool, embedding_model)
-    
-    # Process in smaller batches to avoid overwhelming the system
-    batch_size = 10
-    
-    for i in range(0, len(file_paths), batch_size):
-        batch = file_paths[i:i + batch_size]
-        tasks = []
-        
-        for file_path in batch:
-            # Read file content
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-            except Exception as e:
-                print(f"Could not read {file_path}: {e}")
-                continue
-            
-            # Get or create file record
-            import hashlib
-            content_hash = hashlib.sha256(content.encode()).hexdigest()
-            
-            async with db_pool.acquire() as conn:
-                file_id = await conn.fetchval("""
-                    INSERT INTO files (path, content_hash, last_modified, file_type, loc, status)
-                    VALUES ($1, $2, $3, $4, $5, 'indexing')
-                    ON CONFLICT (path) DO UPDATE
-                    SET content_hash = $2, last_modified = $3, loc = $5, status = 'indexing'
-                    RETURNING id
-                """, str(file_path), content_hash,
-                    datetime.fromtimestamp(file_path.stat().st_mtime, tz=timezone.utc),
-                    file_path.suffix,
-                    len(content.splitlines()))
-            
-            # Create indexing task
-            tasks.append(indexer.index_file(file_path, file_id, content))
-        
-        # Execute batch and check for exceptions
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                print(f"Error indexing {batch[i]}: {result}")
+
+    # Bound in-flight files so N are always being worked on without a slow
+    # file stalling a whole fixed-size batch
+    semaphore = asyncio.Semaphore(16)
+
+    async def read_file(file_path: Path) -> Optional[Tuple[str, str]]:
+        """Read and hash a file off the event loop; returns None on failure"""
+        try:
+            return await asyncio.to_thread(_read_file_content, file_path)
+        except Exception as e:
+            print(f"Could not read {file_path}: {e}")
+            return None
+
+    async def process_file(file_path: Path, content: str, content_hash: str):
+        """Upsert the file record and index it on a single connection"""
+        async with db_pool.acquire() as conn:
+            # Skip files whose content is identical to what's already indexed;
+            # re-parsing and re-embedding them would be pure waste
+            existing = await conn.fetchrow(
+                "SELECT content_hash, status FROM files WHERE path = $1",
+                str(file_path)
+            )
+            if (existing and existing["content_hash"] == content_hash
+                    and existing["status"] == "indexed"):
+                return
+
+            # Stat metadata is stored alongside the hash so the change
+            # monitor can skip hashing untouched files
+            st = file_path.stat()
+            file_id = await conn.fetchval("""
+                INSERT INTO files (path, content_hash, last_modified, file_type, loc, status, mtime_ns, size)
+                VALUES ($1, $2, $3, $4, $5, 'indexing', $6, $7)
+                ON CONFLICT (path) DO UPDATE
+                SET content_hash = $2, last_modified = $3, loc = $5, status = 'indexing',
+                    mtime_ns = $6, size = $7
+                RETURNING id
+            """, str(file_path), content_hash,
+                datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+                file_path.suffix,
+                len(content.splitlines()),
+                st.st_mtime_ns, st.st_size)
+
+            await indexer.index_file(conn, file_path, file_id, content)
+
+    async def run(file_path: Path):
+        """Read, hash and index one file under the concurrency bound"""
+        async with semaphore:
+            read_result = await read_file(file_path)
+            if read_result is None:
+                return
+            content, content_hash = read_result
+            await process_file(file_path, content, content_hash)
+
+    # Launch everything at once; the semaphore keeps 16 files in flight
+    results = await asyncio.gather(
+        *(run(file_path) for file_path in file_paths),
+        return_exceptions=True
+    )
+    for file_path, result in zip(file_paths, results):
+        if isinstance(result, Exception):
+            print(f"Error indexing {file_path}: {result}")
@@ -6,13 +6,103 @@ Extracts entities, relationships, and creates intelligent chunks
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Set, Tuple
 from pathlib import Path
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
 import tree_sitter_cpp as tscpp
 from tree_sitter import Language, Parser, Node
 import re
 
 CPP_LANGUAGE = Language(tscpp.language(), "cpp")
 
-@dataclass
+# Prefixes marking comment lines; tuple form dispatches in one C call
+_COMMENT_PREFIXES = ("//", "/*", "*")
+
+# Control-flow node types counted towards cyclomatic complexity
+_CONTROL_FLOW_TYPES = frozenset({
+    "if_statement", "while_statement", "for_statement",
+    "switch_statement", "case_statement", "catch_clause"
+})
+
+
+class ParseCache:
+    """
+    SQLite-backed cache of extraction results keyed by (path, content hash).
+
+    Parsing plus extraction costs tens of milliseconds per file; a cache hit
+    replaces that with one indexed SELECT and an unpickle, so restarts never
+    re-parse unchanged files.
+    """
+
+    # Bump when the extraction output format changes (entity fields,
+    # chunking rules, ...) so stale pickles are dropped wholesale
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file: Path):
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(cache_file), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                path TEXT,
+                hash BLOB,
+                blob BLOB,
+                PRIMARY KEY (path, hash)
+            )
+        """)
+        # A version bump invalidates every cached entry atomically
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.CACHE_VERSION:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.execute(f"PRAGMA user_version = {self.CACHE_VERSION}")
+        self._conn.commit()
+
+    def get(self, path: str, content_hash: bytes) -> Optional[tuple]:
+        """Return the cached parse result, or None on miss"""
+        row = self._conn.execute(
+            "SELECT blob FROM cache WHERE path = ? AND hash = ?",
+            (path, content_hash)
+        ).fetchone()
+        if row:
+            try:
+                return pickle.loads(row[0])
+            except Exception:
+                return None
+        return None
+
+    def put(self, path: str, content_hash: bytes, result: tuple):
+        """Store a parse result, replacing any stale entry for the path"""
+        try:
+            self._conn.execute("DELETE FROM cache WHERE path = ?", (path,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (path, hash, blob) VALUES (?, ?, ?)",
+                (path, content_hash, pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+            )
+            self._conn.commit()
+        except sqlite3.Error:
+            # Parse-pool workers share the db file; losing a cache write to
+            # lock contention is cheaper than serializing the workers
+            pass
+
+
+_parse_cache: Optional[ParseCache] = None
+_parse_cache_failed = False
+
+
+def _get_parse_cache() -> Optional[ParseCache]:
+    """Lazily open the sidecar cache; disabled if it can't be created"""
+    global _parse_cache, _parse_cache_failed
+    if _parse_cache is None and not _parse_cache_failed:
+        try:
+            cache_dir = Path(os.getenv("CONFIG_PATH", "/app/config"))
+            _parse_cache = ParseCache(cache_dir / "parse_cache.db")
+        except Exception as e:
+            print(f"Warning: parse cache unavailable: {e}")
+            _parse_cache_failed = True
+    return _parse_cache
+
+@dataclass(slots=True)
 class Entity:
     """Represents a code entity (class, function, etc.)"""
     type: str  # class, function, namespace, struct, enum, typedef
@@ -28,7 +118,7 @@ class Entity:
     complexity_score: int
     metadata: Dict[str, Any]
 
-@dataclass
+@dataclass(slots=True)
 class Relationship:
     """Represents a relationship between entities"""
     from_entity: str  # qualified name
@@ -37,7 +127,7 @@ class Relationship:
     context: str
     line_number: int
 
-@dataclass
+@dataclass(slots=True)
 class CodeChunk:
     """Represents a chunk of code for embedding"""
     entity_name: Optional[str]
@@ -53,210 +143,338 @@ class CppParser:
     def __init__(self):
         self.parser = Parser()
         self.parser.set_language(CPP_LANGUAGE)
-        self.current_namespace: List[str] = []
-        self.current_class: Optional[str] = None
-        
+        # Running namespace prefix ("a::b::c") with a stack of restore
+        # lengths, plus the simple name of the innermost open class; this
+        # keeps qualified-name construction a single concatenation instead
+        # of a join over rebuilt lists per entity
+        self._ns_prefix: str = ""
+        self._ns_len_stack: List[int] = []
+        self._current_class_simple: Optional[str] = None
+
+        # Node-type dispatch table for the iterative walk. Each handler
+        # returns an exit action recorded against the node so scopes are
+        # popped (and suppression lifted) when the cursor leaves the subtree.
+        self._handlers = {
+            "namespace_definition": self._enter_namespace,
+            "class_specifier": self._enter_class,
+            "struct_specifier": self._enter_class,
+            "function_definition": self._enter_function,
+            "function_declarator": self._enter_function,
+            "enum_specifier": self._enter_enum,
+            "preproc_include": self._enter_include,
+            "call_expression": self._enter_call,
+            "template_declaration": self._enter_template,
+            "access_specifier": self._enter_access,
+        }
+
+        # Per-file walk state: current access section per open class body,
+        # and the ids of direct children of template_declaration nodes
+        self._access_stack: List[str] = []
+        self._template_children: Set[int] = set()
+
+        # Dedup table for relationship context snippets; repeated call-site
+        # patterns share one string instead of allocating per occurrence
+        self._context_intern: Dict[str, str] = {}
+
     def parse_file(self, file_path: Path, content: str) -> Tuple[List[Entity], List[Relationship], List[CodeChunk]]:
         """Parse a C++ file and return entities, relationships, and chunks"""
-        tree = self.parser.parse(bytes(content, "utf8"))
-        
+        content_bytes = content.encode("utf-8")
+        tree = self.parser.parse(content_bytes)
+
         entities = []
         relationships = []
-        chunks = []
-        
-        self.current_namespace = []
-        self.current_class = None
-        
-        # Extract entities
-        self._extract_entities(tree.root_node, content, entities, relationships)
-        
+
+        self._ns_prefix = ""
+        self._ns_len_stack = []
+        self._current_class_simple = None
+        self._access_stack = []
+        self._template_children = set()
+        self._context_intern = {}
+
+        # Extract entities and relationships in a single traversal
+        self._walk(tree, content_bytes, entities, relationships)
+
         # Extract chunks
         chunks = self._create_chunks(entities, content)
-        
-        # Extract relationships (includes, calls, etc.)
-        self._extract_relationships(tree.root_node, content, relationships)
-        
+
         return entities, relationships, chunks
-    
-    def _extract_entities(self, node: Node, content: str, entities: List[Entity], 
-                         relationships: List[Relationship], parent_name: Optional[str] = None):
-        """Recursively extract entities from AST"""
-        
-        # Namespace declaration
-        if node.type == "namespace_definition":
-            namespace_node = node.child_by_field_name("name")
-            if namespace_node:
-                namespace_name = self._get_node_text(namespace_node, content)
-                self.current_namespace.append(namespace_name)
-                
-                # Process namespace body
-                body = node.child_by_field_name("body")
-                if body:
-                    for child in body.children:
-                        self._extract_entities(child, content, entities, relationships, "::".join(self.current_namespace))
-                
-                self.current_namespace.pop()
-            return
-        
-        # Class/Struct declaration
-        elif node.type in ["class_specifier", "struct_specifier"]:
-            name_node = node.child_by_field_name("name")
-            if name_node:
-                simple_name = self._get_node_text(name_node, content)
-                qualified_name = self._build_qualified_name(simple_name)
-                
-                # Extract base classes (inheritance)
-                base_clause = node.child_by_field_name("base_clause")
-                if base_clause:
-                    for base in self._extract_base_classes(base_clause, content):
-                        relationships.append(Relationship(
-                            from_entity=qualified_name,
-                            to_entity=base,
-                            relationship_type="inherits",
-                            context=f"class {simple_name} : {base}",
-                            line_number=node.start_point[0] + 1
-                        ))
-                
-                entity = Entity(
-                    type="class" if node.type == "class_specifier" else "struct",
-                    simple_name=simple_name,
-                    qualified_name=qualified_name,
-                    signature=f"{node.type.replace('_specifier', '')} {simple_name}",
-                    start_line=node.start_point[0] + 1,
-                    end_line=node.end_point[0] + 1,
-                    start_byte=node.start_byte,
-                    end_byte=node.end_byte,
-                    is_public=True,
-                    parent_id=None,  # Will be resolved later
-                    complexity_score=0,
-                    metadata={"has_templates": self._has_template_params(node)}
-                )
-                entities.append(entity)
-                
-                # Process class body
-                old_class = self.current_class
-                self.current_class = qualified_name
-                
-                body = node.child_by_field_name("body")
-                if body:
-                    for child in body.children:
-                        self._extract_entities(child, content, entities, relationships, qualified_name)
-                
-                self.current_class = old_class
-            return
-        
-        # Function declaration/definition
-        elif node.type in ["function_definition", "function_declarator"]:
-            # Get function name
-            declarator = node if node.type == "function_declarator" else node.child_by_field_name("declarator")
-            if declarator:
-                name_node = self._get_function_name_node(declarator)
-                if name_node:
-                    simple_name = self._get_node_text(name_node, content)
-                    qualified_name = self._build_qualified_name(simple_name)
-                    
-                    # Build signature
-                    signature = self._extract_function_signature(node, content)
-                    
-                    # Calculate complexity (simple heuristic: count if/for/while/switch)
-                    complexity = self._calculate_complexity(node, content)
-                    
-                    entity = Entity(
-                        type="function",
-                        simple_name=simple_name,
-                        qualified_name=qualified_name,
-                        signature=signature,
-                        start_line=node.start_point[0] + 1,
-                        end_line=node.end_point[0] + 1,
-                        start_byte=node.start_byte,
-                        end_byte=node.end_byte,
-                        is_public=self._is_public(node),
-                        parent_id=None,
-                        complexity_score=complexity,
-                        metadata={
-                            "is_definition": node.type == "function_definition",
-                            "has_templates": self._has_template_params(node.parent) if node.parent else False
-                        }
-                    )
-                    entities.append(entity)
-            return
-        
-        # Enum declaration
-        elif node.type == "enum_specifier":
-            name_node = node.child_by_field_name("name")
+
+    def _walk(self, tree, content_bytes: bytes, entities: List[Entity],
+              relationships: List[Relationship]):
+        """
+        Single iterative pre-order walk over the AST.
+
+        Replaces the two recursive extraction passes: one tree-sitter cursor
+        visits every node once, dispatching on node type. Entity handlers are
+        disabled inside suppressed subtrees (function bodies, anonymous
+        namespaces/classes) to match the old entity pass, while includes and
+        calls are collected everywhere like the old relationship pass.
+        """
+        cursor = tree.walk()
+        exit_actions: Dict[int, Any] = {}  # node.id -> action recorded on entry
+        suppress = 0  # depth of entity-suppressing ancestors
+        self._complexity_stack = []  # [entity_index, counter] per open function
+        complexity_stack = self._complexity_stack
+
+        # Hoist attribute lookups out of the per-node loop; this runs once
+        # per AST node, which dominates extraction time after parsing
+        control_flow_types = _CONTROL_FLOW_TYPES
+        get_handler = self._handlers.get
+        pop_action = exit_actions.pop
+        goto_first_child = cursor.goto_first_child
+        goto_next_sibling = cursor.goto_next_sibling
+        goto_parent = cursor.goto_parent
+
+        while True:
+            node = cursor.node
+            node_type = node.type
+
+            # Count control flow towards the innermost open function, so no
+            # second subtree traversal is needed per function entity
+            if complexity_stack and node_type in control_flow_types:
+                complexity_stack[-1][1] += 1
+
+            handler = get_handler(node_type)
+            if handler:
+                action = handler(node, content_bytes, entities, relationships, suppress == 0)
+                if action is not None:
+                    exit_actions[node.id] = action
+                    if action == "suppress" or action == "function":
+                        suppress += 1
+
+            if goto_first_child():
+                continue
+
+            # Leaf reached: unwind, applying exit actions as we leave nodes
+            while True:
+                action = pop_action(cursor.node.id, None)
+                if action == "suppress":
+                    suppress -= 1
+                elif action == "function":
+                    suppress -= 1
+                    entity_index, counter = self._complexity_stack.pop()
+                    entities[entity_index].complexity_score = counter
+                elif action == "namespace":
+                    self._ns_prefix = self._ns_prefix[:self._ns_len_stack.pop()]
+                elif action is not None:
+                    # ("class", previous_class) scope restore
+                    self._current_class_simple = action[1]
+                    self._access_stack.pop()
+
+                if goto_next_sibling():
+                    break
+                if not goto_parent():
+                    return
+
+    # Walk handlers
+
+    def _enter_namespace(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                         relationships: List[Relationship], extract_entities: bool):
+        """Push named namespaces; skip entity extraction in anonymous ones"""
+        if not extract_entities:
+            return None
+        namespace_node = node.child_by_field_name("name")
+        if not namespace_node:
+            return "suppress"
+        name = self._get_node_text(namespace_node, content_bytes)
+        self._ns_len_stack.append(len(self._ns_prefix))
+        self._ns_prefix = f"{self._ns_prefix}::{name}" if self._ns_prefix else name
+        return "namespace"
+
+    def _enter_class(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                     relationships: List[Relationship], extract_entities: bool):
+        """Record a class/struct entity and enter its scope"""
+        if not extract_entities:
+            return None
+        name_node = node.child_by_field_name("name")
+        if not name_node:
+            return "suppress"
+
+        simple_name = sys.intern(self._get_node_text(name_node, content_bytes))
+        qualified_name = self._build_qualified_name(simple_name)
+
+        # Extract base classes (inheritance)
+        base_clause = node.child_by_field_name("base_clause")
+        if base_clause:
+            for base in self._extract_base_classes(base_clause, content_bytes):
+                relationships.append(Relationship(
+                    from_entity=qualified_name,
+                    to_entity=base,
+                    relationship_type="inherits",
+                    context=f"class {simple_name} : {base}",
+                    line_number=node.start_point[0] + 1
+                ))
+
+        entities.append(Entity(
+            type="class" if node.type == "class_specifier" else "struct",
+            simple_name=simple_name,
+            qualified_name=qualified_name,
+            signature=f"{node.type.replace('_specifier', '')} {simple_name}",
+            start_line=node.start_point[0] + 1,
+            end_line=node.end_point[0] + 1,
+            start_byte=node.start_byte,
+            end_byte=node.end_byte,
+            is_public=True,
+            parent_id=None,  # Will be resolved later
+            complexity_score=0,
+            metadata={"has_templates": self._has_template_params(node)}
+        ))
+
+        old_class = self._current_class_simple
+        self._current_class_simple = simple_name
+        # Class bodies start private, struct bodies public, until an
+        # access_specifier node switches the section
+        self._access_stack.append("private" if node.type == "class_specifier" else "public")
+        return ("class", old_class)
+
+    def _enter_function(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                        relationships: List[Relationship], extract_entities: bool):
+        """Record a function entity; its body stays suppressed for entities"""
+        if not extract_entities:
+            return None
+
+        # Get function name
+        declarator = node if node.type == "function_declarator" else node.child_by_field_name("declarator")
+        if declarator:
+            name_node = self._get_function_name_node(declarator)
             if name_node:
-                simple_name = self._get_node_text(name_node, content)
+                simple_name = sys.intern(self._get_node_text(name_node, content_bytes))
                 qualified_name = self._build_qualified_name(simple_name)
-                
-                entity = Entity(
-                    type="enum",
+
+                # Build signature
+                signature = self._extract_function_signature(node, content_bytes)
+
+                entities.append(Entity(
+                    type="function",
                     simple_name=simple_name,
                     qualified_name=qualified_name,
-                    signature=f"enum {simple_name}",
+                    signature=signature,
                     start_line=node.start_point[0] + 1,
                     end_line=node.end_point[0] + 1,
                     start_byte=node.start_byte,
                     end_byte=node.end_byte,
-                    is_public=True,
+                    is_public=self._is_public(node),
                     parent_id=None,
-                    complexity_score=0,
-                    metadata={}
-                )
-                entities.append(entity)
-            return
-        
-        # Recursively process children
-        for child in node.children:
-            self._extract_entities(child, content, entities, relationships, parent_name)
-    
-    def _extract_relationships(self, node: Node, content: str, relationships: List[Relationship]):
-        """Extract call relationships and includes"""
-        
-        # Include statements
-        if node.type == "preproc_include":
-            include_path = None
-            for child in node.children:
-                if child.type in ["string_literal", "system_lib_string"]:
-                    include_path = self._get_node_text(child, content).strip('"<>')
-                    break
-            
-            if include_path:
-                relationships.append(Relationship(
-                    from_entity="",  # File-level relationship
-                    to_entity=include_path,
-                    relationship_type="includes",
-                    context=self._get_node_text(node, content),
-                    line_number=node.start_point[0] + 1
-                ))
-        
-        # Function calls
-        elif node.type == "call_expression":
-            function_node = node.child_by_field_name("function")
-            if function_node:
-                called_function = self._get_node_text(function_node, content)
-                # We'll record this and resolve to actual entity later
-                relationships.append(Relationship(
-                    from_entity="",  # Will be filled in context
-                    to_entity=called_function,
-                    relationship_type="calls",
-                    context=self._get_node_text(node, content)[:200],  # Truncate long calls
-                    line_number=node.start_point[0] + 1
+                    complexity_score=1,  # Base; control flow is added during the walk
+                    metadata={
+                        "is_definition": node.type == "function_definition",
+                        "has_templates": self._has_template_params(node)
+                    }
                 ))
-        
-        # Recursively process children
+                # Open a complexity frame; closed when the walk leaves the node
+                self._complexity_stack.append([len(entities) - 1, 1])
+                return "function"
+        return "suppress"
+
+    def _enter_enum(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                    relationships: List[Relationship], extract_entities: bool):
+        """Record an enum entity"""
+        if not extract_entities:
+            return None
+        name_node = node.child_by_field_name("name")
+        if name_node:
+            simple_name = sys.intern(self._get_node_text(name_node, content_bytes))
+            entities.append(Entity(
+                type="enum",
+                simple_name=simple_name,
+                qualified_name=self._build_qualified_name(simple_name),
+                signature=f"enum {simple_name}",
+                start_line=node.start_point[0] + 1,
+                end_line=node.end_point[0] + 1,
+                start_byte=node.start_byte,
+                end_byte=node.end_byte,
+                is_public=True,
+                parent_id=None,
+                complexity_score=0,
+                metadata={}
+            ))
+        return "suppress"
+
+    def _enter_include(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                       relationships: List[Relationship], extract_entities: bool):
+        """Record an include relationship"""
+        include_path = None
         for child in node.children:
-            self._extract_relationships(child, content, relationships)
-    
+            if child.type in ["string_literal", "system_lib_string"]:
+                include_path = sys.intern(self._get_node_text(child, content_bytes).strip('"<>'))
+                break
+
+        if include_path:
+            relationships.append(Relationship(
+                from_entity="",  # File-level relationship
+                to_entity=include_path,
+                relationship_type="includes",
+                context=self._get_node_text(node, content_bytes),
+                line_number=node.start_point[0] + 1
+            ))
+        return None
+
+    def _enter_call(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                    relationships: List[Relationship], extract_entities: bool):
+        """Record a call relationship"""
+        function_node = node.child_by_field_name("function")
+        if function_node:
+            called_function = sys.intern(self._get_node_text(function_node, content_bytes))
+            raw_ctx = self._get_node_text(node, content_bytes)[:200]  # Truncate long calls
+            # We'll record this and resolve to actual entity later
+            relationships.append(Relationship(
+                from_entity="",  # Will be filled in context
+                to_entity=called_function,
+                relationship_type="calls",
+                context=self._context_intern.setdefault(raw_ctx, raw_ctx),
+                line_number=node.start_point[0] + 1
+            ))
+        return None
+
+    def _enter_template(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                        relationships: List[Relationship], extract_entities: bool):
+        """Record which nodes sit directly under a template declaration"""
+        for child in node.children:
+            self._template_children.add(child.id)
+        return None
+
+    def _enter_access(self, node: Node, content_bytes: bytes, entities: List[Entity],
+                      relationships: List[Relationship], extract_entities: bool):
+        """Switch the current access section of the enclosing class body"""
+        if extract_entities and self._access_stack:
+            self._access_stack[-1] = self._get_node_text(node, content_bytes).rstrip(":").strip()
+        return None
+
     def _create_chunks(self, entities: List[Entity], content: str) -> List[CodeChunk]:
         """Create intelligent chunks from entities"""
         chunks = []
-        lines = content.splitlines()
-        
+
+        # Build a line-offset index once instead of materializing every line;
+        # entity text then comes from two index lookups and one slice
+        line_starts = [0]
+        find = content.find
+        append = line_starts.append
+        pos = find('\n')
+        while pos != -1:
+            append(pos + 1)
+            pos = find('\n', pos + 1)
+        n_lines = len(line_starts)
+        total_len = len(content)
+
+        def get_line(i: int) -> str:
+            """Return line i (0-based) without its newline"""
+            end = line_starts[i + 1] - 1 if i + 1 < n_lines else total_len
+            return content[line_starts[i]:end]
+
+        def get_span(start_line: int, end_line: int) -> str:
+            """Return lines start_line..end_line (1-based, inclusive)"""
+            end = line_starts[end_line] - 1 if end_line < n_lines else total_len
+            return content[line_starts[start_line - 1]:end]
+
         for entity in entities:
-            # Get the entity code
-            entity_lines = lines[entity.start_line - 1:entity.end_line]
-            entity_code = "\n".join(entity_lines)
-            
+            # Locate the entity code; the full text is only materialized
+            # for entities small enough to be emitted whole
+            start_line = min(entity.start_line, n_lines)
+            end_line = min(entity.end_line, n_lines)
+            num_lines = end_line - start_line + 1
+            entity_start = line_starts[start_line - 1]
+            entity_end = line_starts[end_line] - 1 if end_line < n_lines else total_len
+
             # Determine chunk type
             if entity.type == "function" and entity.metadata.get("is_definition"):
                 chunk_type = "implementation"
@@ -268,10 +486,10 @@ class CppParser:
                 chunk_type = "mixed"
             
             # For large entities, create multiple chunks
-            if len(entity_lines) > 100:
+            if num_lines > 100:
                 # Split into smaller chunks (e.g., by method for classes)
                 # For now, just take the first 100 lines
-                chunk_code = "\n".join(entity_lines[:100])
+                chunk_code = get_span(start_line, start_line + 99)
                 chunks.append(CodeChunk(
                     entity_name=entity.qualified_name,
                     chunk_type=chunk_type,
@@ -284,7 +502,7 @@ class CppParser:
                 chunks.append(CodeChunk(
                     entity_name=entity.qualified_name,
                     chunk_type=chunk_type,
-                    content=entity_code,
+                    content=content[entity_start:entity_end],
                     start_line=entity.start_line,
                     end_line=entity.end_line,
                     metadata={}
@@ -295,20 +513,26 @@ class CppParser:
                 # Look backwards for comment block
                 comment_lines = []
                 for i in range(entity.start_line - 2, max(-1, entity.start_line - 20), -1):
-                    line = lines[i].strip()
-                    if line.startswith("//") or line.startswith("/*") or line.startswith("*"):
-                        comment_lines.insert(0, lines[i])
-                    elif line == "":
+                    raw_line = get_line(i)
+                    line = raw_line.strip()
+                    if not line:
                         continue
+                    if line.startswith(_COMMENT_PREFIXES):
+                        comment_lines.append(raw_line)
                     else:
                         break
+                # Collected bottom-up; restore file order in one pass
+                comment_lines.reverse()
                 
                 if len(comment_lines) > 2:  # Only if substantial comment
                     comment_text = "\n".join(comment_lines)
+                    # 200-char preview sliced straight out of the original
+                    # content, without building the full entity text
+                    preview = content[entity_start:min(entity_start + 200, entity_end)]
                     chunks.append(CodeChunk(
                         entity_name=entity.qualified_name,
                         chunk_type="comment_block",
-                        content=comment_text + "\n\n" + entity_code[:200],  # Include snippet
+                        content=comment_text + "\n\n" + preview,  # Include snippet
                         start_line=entity.start_line - len(comment_lines),
                         end_line=entity.start_line,
                         metadata={"comment_for": entity.qualified_name}
@@ -318,83 +542,88 @@ class CppParser:
     
     # Helper methods
     
-    def _get_node_text(self, node: Node, content: str) -> str:
-        """Get text content of a node"""
-        return content[node.start_byte:node.end_byte]
+    def _get_node_text(self, node: Node, content_bytes: bytes) -> str:
+        """Get text content of a node by byte offsets (decode only the slice)"""
+        return content_bytes[node.start_byte:node.end_byte].decode("utf-8", "replace")
     
     def _build_qualified_name(self, simple_name: str) -> str:
-        """Build fully qualified name with namespace and class context"""
-        parts = []
-        if self.current_namespace:
-            parts.extend(self.current_namespace)
-        if self.current_class:
-            parts.append(self.current_class.split("::")[-1])  # Just the class name
-        parts.append(simple_name)
-        return "::".join(parts)
+        """Build fully qualified name with namespace and class context.
+
+        Names are interned: the same symbols recur across a codebase, and
+        interning deduplicates them and makes later dict keying cheaper.
+        """
+        if self._current_class_simple:  # Just the innermost class name
+            if self._ns_prefix:
+                return sys.intern(f"{self._ns_prefix}::{self._current_class_simple}::{simple_name}")
+            return sys.intern(f"{self._current_class_simple}::{simple_name}")
+        if self._ns_prefix:
+            return sys.intern(f"{self._ns_prefix}::{simple_name}")
+        return simple_name
     
     def _get_function_name_node(self, declarator: Node) -> Optional[Node]:
         """Extract function name from declarator"""
         if declarator.type == "function_declarator":
             declarator = declarator.child_by_field_name("declarator")
-        
-        if declarator:
-            if declarator.type == "identifier":
-                return declarator
-            elif declarator.type in ["qualified_identifier", "field_identifier"]:
-                # Return the last identifier
-                for child in reversed(declarator.children):
-                    if child.type in ["identifier", "field_identifier"]:
-                        return child
-            elif declarator.type == "destructor_name":
+
+        while declarator is not None:
+            node_type = declarator.type
+            if node_type in ("identifier", "field_identifier", "destructor_name"):
                 return declarator
-        
+            if node_type == "qualified_identifier":
+                # Follow the name field (O(1) C-level lookup) instead of
+                # materializing and scanning the child list
+                declarator = declarator.child_by_field_name("name")
+                continue
+            return None
         return None
     
-    def _extract_function_signature(self, node: Node, content: str) -> str:
+    def _extract_function_signature(self, node: Node, content_bytes: bytes) -> str:
         """Extract function signature"""
         # This is simplified - full signature extraction is complex
         declarator = node if node.type == "function_declarator" else node.child_by_field_name("declarator")
         if declarator:
-            return self._get_node_text(declarator, content)
+            return self._get_node_text(declarator, content_bytes)
         return ""
     
-    def _extract_base_classes(self, base_clause: Node, content: str) -> List[str]:
+    def _extract_base_classes(self, base_clause: Node, content_bytes: bytes) -> List[str]:
         """Extract base class names from inheritance clause"""
         bases = []
         for child in base_clause.children:
             if child.type == "type_identifier":
-                bases.append(self._get_node_text(child, content))
+                bases.append(sys.intern(self._get_node_text(child, content_bytes)))
             elif child.type == "qualified_identifier":
-                bases.append(self._get_node_text(child, content))
+                bases.append(sys.intern(self._get_node_text(child, content_bytes)))
         return bases
     
     def _has_template_params(self, node: Optional[Node]) -> bool:
-        """Check if node has template parameters"""
-        if not node:
-            return False
-        return node.type == "template_declaration"
-    
+        """O(1) check against the template children recorded during the walk"""
+        return node is not None and node.id in self._template_children
+
     def _is_public(self, node: Node) -> bool:
-        """Determine if a member is public (simplified)"""
-        # In a real implementation, track access specifiers
-        return True
+        """Determine if a member is public from the tracked access section"""
+        return self._access_stack[-1] == "public" if self._access_stack else True
     
-    def _calculate_complexity(self, node: Node, content: str) -> int:
-        """Calculate cyclomatic complexity (simplified)"""
-        complexity = 1  # Base complexity
-        
-        def count_control_flow(n: Node):
-            nonlocal complexity
-            if n.type in ["if_statement", "while_statement", "for_statement", 
-                         "switch_statement", "case_statement", "catch_clause"]:
-                complexity += 1
-            for child in n.children:
-                count_control_flow(child)
-        
-        count_control_flow(node)
-        return complexity
+# Reused parser instance; building a Parser and binding the language per
+# file is measurable, and each parse-pool worker process gets its own
+_cpp_parser: Optional[CppParser] = None
+
 
 def parse_cpp_file(file_path: Path, content: str) -> Tuple[List[Entity], List[Relationship], List[CodeChunk]]:
-    """Convenience function to parse a C++ file"""
-    parser = CppParser()
-    return parser.parse_file(file_path, content)
+    """Convenience function to parse a C++ file, consulting the parse cache"""
+    global _cpp_parser
+    cache = _get_parse_cache()
+    content_hash = hashlib.sha256(content.encode()).digest()
+
+    if cache:
+        cached = cache.get(str(file_path), content_hash)
+        if cached is not None:
+            return cached
+
+    if _cpp_parser is None:
+        _cpp_parser = CppParser()
+    result = _cpp_parser.parse_file(file_path, content)
+
+    if cache:
+        cache.put(str(file_path), content_hash, result)
+
+    return result
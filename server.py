@@ -4,21 +4,37 @@ HTTP-based MCP server for analyzing large C++ codebases
 """
 
 import asyncio
-import hashlib
 import json
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 import os
 
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
 from pydantic import BaseModel
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
 import asyncpg
 from sentence_transformers import SentenceTransformer
 import numpy as np
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps_result(obj: Any) -> str:
+    """Serialize a tool result compactly, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
 # MCP Protocol Models
 class Tool(BaseModel):
     name: str
@@ -37,7 +53,11 @@ class CallToolResult(BaseModel):
     isError: Optional[bool] = False
 
 # Application
-app = FastAPI(title="C++ Graph-RAG MCP Server")
+# orjson serializes responses several times faster than the default encoder;
+# fall back to the stdlib response class when it isn't installed
+_response_class = ORJSONResponse if orjson is not None else JSONResponse
+app = FastAPI(title="C++ Graph-RAG MCP Server",
+              default_response_class=_response_class)
 
 # Global state
 db_pool: Optional[asyncpg.Pool] = None
@@ -57,6 +77,10 @@ indexing_status = {
     "chunks_count": 0
 }
 
+# Throttle for the DB-derived counters in /api/status
+STATUS_COUNTS_TTL = 1.0
+_status_counts_ts = 0.0
+
 # Indexing activity log (keep last 100 entries)
 indexing_log = []
 MAX_LOG_ENTRIES = 100
@@ -84,23 +108,38 @@ async def root():
         return FileResponse(str(index_path))
     return {"message": "C++ Graph-RAG MCP Server", "status": "running"}
 
+async def _init_connection(conn: asyncpg.Connection):
+    """Register the pgvector codec so embeddings travel in binary format"""
+    from pgvector.asyncpg import register_vector
+    await register_vector(conn)
+    # Candidate-list size for HNSW search; 40 keeps recall high at our
+    # result counts without rescanning the graph
+    await conn.execute("SET hnsw.ef_search = 40")
+    # The tool queries are short LIMIT queries: JIT compilation costs more
+    # than it saves, and generic plans let the statement cache pay off
+    # instead of re-planning per parameter set
+    await conn.execute("SET jit = off")
+    await conn.execute("SET plan_cache_mode = force_generic_plan")
+    # Headroom for the vector ORDER BY without spilling to disk
+    await conn.execute("SET work_mem = '32MB'")
+
 @app.on_event("startup")
 async def startup():
     """Initialize database connection pool and embedding model"""
     global db_pool, embedding_model, monitoring_paths
-    
-    # Wait for database to be ready
+
+    # Wait for database to be ready; initialize the schema on a direct
+    # connection so the vector extension exists before pool connections
+    # try to register its codec
     max_retries = 30
     for i in range(max_retries):
         try:
-            db_pool = await asyncpg.create_pool(
+            conn = await asyncpg.connect(
                 host=DB_HOST,
                 port=DB_PORT,
                 database=DB_NAME,
                 user=DB_USER,
-                password=DB_PASSWORD,
-                min_size=5,
-                max_size=20
+                password=DB_PASSWORD
             )
             break
         except Exception as e:
@@ -109,11 +148,39 @@ async def startup():
                 await asyncio.sleep(2)
             else:
                 raise e
-    
+
     # Initialize schema
-    await initialize_database()
+    try:
+        await initialize_database(conn)
+    finally:
+        await conn.close()
+
+    db_pool = await asyncpg.create_pool(
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        min_size=5,
+        max_size=20,
+        # Keep every tool's fixed-shape SQL prepared per connection so the
+        # hot queries skip parse/plan after first use; statements never age
+        # out on their own
+        statement_cache_size=1024,
+        max_cached_statement_lifetime=0,
+        # Recycle connections idle for five minutes so bursts (indexing,
+        # multi-frame analyses) don't leave a widened pool pinned forever,
+        # and bound any single query
+        max_inactive_connection_lifetime=300,
+        command_timeout=60,
+        init=_init_connection
+    )
     
-    # Load embedding model (runs on CPU, but fast enough for local use)
+    # Load embedding model (runs on CPU, but fast enough for local use).
+    # Cap torch's thread pool to half the cores so concurrent indexing
+    # workers don't oversubscribe the CPU and thrash each other
+    import torch
+    torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
     print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}")
     embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
     print("Embedding model loaded")
@@ -144,11 +211,12 @@ async def shutdown():
     if db_pool:
         await db_pool.close()
 
-async def initialize_database():
+async def initialize_database(conn: asyncpg.Connection):
     """Create database schema if not exists"""
     schema_sql = """
     CREATE EXTENSION IF NOT EXISTS vector;
-    
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
     CREATE TABLE IF NOT EXISTS files (
         id SERIAL PRIMARY KEY,
         path TEXT UNIQUE NOT NULL,
@@ -157,8 +225,23 @@ async def initialize_database():
         last_indexed TIMESTAMPTZ,
         file_type VARCHAR(50),
         loc INTEGER,
-        status VARCHAR(20) DEFAULT 'pending'
+        status VARCHAR(20) DEFAULT 'pending',
+        mtime_ns BIGINT,
+        size BIGINT
     );
+
+    -- Stat metadata columns for the change monitor's cheap pre-check;
+    -- added separately so pre-existing databases pick them up
+    ALTER TABLE files ADD COLUMN IF NOT EXISTS mtime_ns BIGINT;
+    ALTER TABLE files ADD COLUMN IF NOT EXISTS size BIGINT;
+
+    -- Forward-slash-normalized path so debugger paths (Windows
+    -- backslashes) match without per-query replace(); the trigram index
+    -- serves the substring LIKEs of the crash-location lookups
+    ALTER TABLE files ADD COLUMN IF NOT EXISTS path_posix TEXT
+        GENERATED ALWAYS AS (replace(path, chr(92), '/')) STORED;
+    CREATE INDEX IF NOT EXISTS idx_files_path_posix_trgm
+        ON files USING gin (path_posix gin_trgm_ops);
     
     CREATE TABLE IF NOT EXISTS entities (
         id SERIAL PRIMARY KEY,
@@ -179,7 +262,58 @@ async def initialize_database():
     CREATE INDEX IF NOT EXISTS idx_entities_simple_name ON entities(simple_name);
     CREATE INDEX IF NOT EXISTS idx_entities_file ON entities(file_id);
     CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(type);
-    
+
+    -- Trigram index so substring symbol lookups use an index scan
+    -- instead of a sequential scan over all entities
+    CREATE INDEX IF NOT EXISTS idx_entities_qname_trgm
+        ON entities USING gin (qualified_name gin_trgm_ops);
+
+    -- Shared entity-resolution helper for the lookup tools: exact
+    -- simple-name matches rank above substring matches, which are
+    -- ordered by trigram similarity so the closest name becomes the
+    -- primary match. STABLE so the plan is cached and ranking changes
+    -- happen in one place instead of four.
+    CREATE OR REPLACE FUNCTION find_entity(sym text, max_matches integer DEFAULT 10)
+    RETURNS TABLE (
+        id integer,
+        type varchar(50),
+        qualified_name text,
+        simple_name text,
+        signature text,
+        start_line integer,
+        end_line integer,
+        complexity_score integer,
+        metadata jsonb,
+        file_id integer,
+        file_path text
+    ) AS $fn$
+        SELECT * FROM (
+            (SELECT e.id, e.type, e.qualified_name, e.simple_name,
+                    e.signature, e.start_line, e.end_line,
+                    e.complexity_score, e.metadata, e.file_id,
+                    f.path AS file_path
+             FROM entities e
+             JOIN files f ON e.file_id = f.id
+             WHERE e.simple_name = sym
+             LIMIT max_matches)
+            UNION ALL
+            (SELECT e.id, e.type, e.qualified_name, e.simple_name,
+                    e.signature, e.start_line, e.end_line,
+                    e.complexity_score, e.metadata, e.file_id,
+                    f.path AS file_path
+             FROM entities e
+             JOIN files f ON e.file_id = f.id
+             WHERE e.qualified_name ILIKE '%' || sym || '%'
+               AND e.simple_name <> sym
+             ORDER BY similarity(e.qualified_name, sym) DESC
+             LIMIT max_matches)
+        ) m
+        ORDER BY (m.simple_name = sym) DESC,
+                 similarity(m.qualified_name, sym) DESC,
+                 length(m.qualified_name)
+        LIMIT max_matches
+    $fn$ LANGUAGE sql STABLE;
+
     CREATE TABLE IF NOT EXISTS relationships (
         id SERIAL PRIMARY KEY,
         from_entity_id INTEGER REFERENCES entities(id) ON DELETE CASCADE,
@@ -190,8 +324,13 @@ async def initialize_database():
         is_direct BOOLEAN DEFAULT true
     );
     
-    CREATE INDEX IF NOT EXISTS idx_rel_from ON relationships(from_entity_id, relationship_type);
-    CREATE INDEX IF NOT EXISTS idx_rel_to ON relationships(to_entity_id, relationship_type);
+    -- Composite indexes covering both relationship endpoints, so the
+    -- DISTINCT ON caller/callee queries dedupe by index navigation;
+    -- the old two-column variants are a strict prefix and get dropped
+    DROP INDEX IF EXISTS idx_rel_from;
+    DROP INDEX IF EXISTS idx_rel_to;
+    CREATE INDEX IF NOT EXISTS idx_rel_from_type_to ON relationships(from_entity_id, relationship_type, to_entity_id);
+    CREATE INDEX IF NOT EXISTS idx_rel_to_type_from ON relationships(to_entity_id, relationship_type, from_entity_id);
     
     CREATE TABLE IF NOT EXISTS code_chunks (
         id SERIAL PRIMARY KEY,
@@ -201,17 +340,44 @@ async def initialize_database():
         content TEXT NOT NULL,
         start_line INTEGER,
         end_line INTEGER,
-        embedding vector(384),
+        embedding halfvec(384),
         metadata JSONB
     );
-    
+
+    -- Migrate pre-existing databases from fp32 vector to fp16 halfvec
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'code_chunks' AND column_name = 'embedding'
+              AND udt_name = 'vector'
+        ) THEN
+            ALTER TABLE code_chunks ALTER COLUMN embedding TYPE halfvec(384);
+        END IF;
+    END $$;
+
     CREATE INDEX IF NOT EXISTS idx_chunks_entity ON code_chunks(entity_id);
     CREATE INDEX IF NOT EXISTS idx_chunks_file ON code_chunks(file_id);
+    CREATE INDEX IF NOT EXISTS idx_chunks_type ON code_chunks(chunk_type);
+
+    -- ANN index so vector search is a graph walk, not a sequential scan
+    -- over every embedding; built with extra memory for speed
+    SET maintenance_work_mem = '512MB';
+    CREATE INDEX IF NOT EXISTS idx_chunks_embedding_hnsw
+        ON code_chunks USING hnsw (embedding halfvec_cosine_ops)
+        WITH (m = 16, ef_construction = 64);
+
+    -- Partial ANN index for scope=files searches, which filter on
+    -- entity_id IS NULL and would otherwise fall off the main index
+    CREATE INDEX IF NOT EXISTS idx_chunks_embedding_hnsw_file
+        ON code_chunks USING hnsw (embedding halfvec_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+        WHERE entity_id IS NULL;
+    RESET maintenance_work_mem;
     """
     
-    async with db_pool.acquire() as conn:
-        await conn.execute(schema_sql)
-    
+    await conn.execute(schema_sql)
+
     print("Database schema initialized")
 
 # =============================================================================
@@ -221,25 +387,33 @@ async def initialize_database():
 @app.get("/api/status")
 async def get_indexing_status():
     """Get current indexing status"""
-    global indexing_status
-    
-    # Update counts from database (but not during active indexing)
-    if db_pool and not indexing_status.get("is_indexing", False):
+    global indexing_status, _status_counts_ts
+
+    # Update counts from database (but not during active indexing).
+    # Dashboards poll this every second or two; a short TTL keeps the
+    # COUNT queries from running on every poll
+    if (db_pool and not indexing_status.get("is_indexing", False)
+            and time.monotonic() - _status_counts_ts > STATUS_COUNTS_TTL):
         try:
             async with db_pool.acquire() as conn:
-                entities_count = await conn.fetchval("SELECT COUNT(*) FROM entities")
-                relationships_count = await conn.fetchval("SELECT COUNT(*) FROM relationships")
-                chunks_count = await conn.fetchval("SELECT COUNT(*) FROM code_chunks")
-                total_files = await conn.fetchval("SELECT COUNT(*) FROM files")
-                files_indexed = await conn.fetchval("SELECT COUNT(*) FROM files WHERE status = 'indexed'")
-                files_pending = await conn.fetchval("SELECT COUNT(*) FROM files WHERE status = 'pending'")
-                
-                indexing_status["entities_count"] = entities_count or 0
-                indexing_status["relationships_count"] = relationships_count or 0
-                indexing_status["chunks_count"] = chunks_count or 0
-                indexing_status["total_files"] = total_files or 0
-                indexing_status["indexed_files"] = files_indexed or 0
-                indexing_status["pending_files"] = files_pending or 0
+                # One round trip for all the counters instead of six
+                counts = await conn.fetchrow("""
+                    SELECT
+                        (SELECT COUNT(*) FROM entities) AS entities_count,
+                        (SELECT COUNT(*) FROM relationships) AS relationships_count,
+                        (SELECT COUNT(*) FROM code_chunks) AS chunks_count,
+                        (SELECT COUNT(*) FROM files) AS total_files,
+                        (SELECT COUNT(*) FROM files WHERE status = 'indexed') AS indexed_files,
+                        (SELECT COUNT(*) FROM files WHERE status = 'pending') AS pending_files
+                """)
+
+                indexing_status["entities_count"] = counts["entities_count"] or 0
+                indexing_status["relationships_count"] = counts["relationships_count"] or 0
+                indexing_status["chunks_count"] = counts["chunks_count"] or 0
+                indexing_status["total_files"] = counts["total_files"] or 0
+                indexing_status["indexed_files"] = counts["indexed_files"] or 0
+                indexing_status["pending_files"] = counts["pending_files"] or 0
+                _status_counts_ts = time.monotonic()
         except Exception as e:
             print(f"Error fetching status: {e}")
     
@@ -267,9 +441,10 @@ async def update_monitored_directories(request: Dict[str, Any]):
     paths = request.get("monitored_paths", [])
     config_manager.save_config({"monitored_paths": paths})
     
-    # Update in-memory paths
+    # Update in-memory paths and move the filesystem watches over
     monitoring_paths = [Path(p) for p in paths if p]
-    
+    _schedule_watches()
+
     # Trigger re-indexing
     asyncio.create_task(initial_indexing())
     
@@ -298,17 +473,45 @@ async def delete_directory_data(path: str):
         print(f"Error deleting directory data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/browse")
-async def browse_directory(path: str = "/host"):
-    """Browse directory structure for file picker"""
+def _count_cpp(root: str, cap: int = 9999) -> int:
+    """Count C++ source files under a directory in a single scandir walk.
+
+    Uses an explicit stack instead of several rglob passes, and stops as
+    soon as the cap is reached. Unreadable subdirectories are skipped.
+    """
+    count = 0
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith((".cpp", ".h", ".hpp", ".cc", ".cxx")):
+                        count += 1
+                        if count >= cap:
+                            return cap
+        except OSError:
+            continue
+    return count
+
+
+@lru_cache(maxsize=1024)
+def _count_cpp_cached(root: str, mtime_ns: int) -> int:
+    """Cached file count; mtime_ns keys cache entries to directory changes"""
+    return _count_cpp(root)
+
+
+def _browse_sync(path: str) -> dict:
+    """Blocking directory listing for the file picker; runs in a thread"""
     try:
         target = Path(path)
         if not target.exists():
             return {"error": f"Path does not exist: {path}", "items": []}
-        
+
         if not target.is_dir():
             return {"error": f"Path is not a directory: {path}", "items": []}
-        
+
         items = []
         try:
             for item in sorted(target.iterdir()):
@@ -317,27 +520,28 @@ async def browse_directory(path: str = "/host"):
                     continue
                 if item.name in ['node_modules', '__pycache__', '.git', 'venv', 'env']:
                     continue
-                
+
                 item_info = {
                     "name": item.name,
                     "path": str(item),
                     "is_dir": item.is_dir()
                 }
-                
+
                 # For directories, count C++ files
                 if item.is_dir():
                     try:
-                        cpp_count = sum(1 for _ in item.rglob("*.cpp")) + \
-                                   sum(1 for _ in item.rglob("*.h")) + \
-                                   sum(1 for _ in item.rglob("*.hpp"))
-                        item_info["cpp_files"] = min(cpp_count, 9999)  # Cap for performance
+                        # One scandir walk, cached until the directory's
+                        # mtime changes
+                        item_info["cpp_files"] = _count_cpp_cached(
+                            str(item), item.stat().st_mtime_ns
+                        )
                     except:
                         item_info["cpp_files"] = 0
-                
+
                 items.append(item_info)
         except PermissionError:
             return {"error": f"Permission denied: {path}", "items": []}
-        
+
         return {
             "current_path": str(target),
             "parent_path": str(target.parent) if target.parent != target else None,
@@ -346,6 +550,13 @@ async def browse_directory(path: str = "/host"):
     except Exception as e:
         return {"error": str(e), "items": []}
 
+@app.get("/api/browse")
+async def browse_directory(path: str = "/host"):
+    """Browse directory structure for file picker"""
+    # All the iterdir/stat/scandir work is blocking, so keep it off the
+    # event loop where it would starve the MCP endpoints
+    return await asyncio.to_thread(_browse_sync, path)
+
 @app.post("/api/search")
 async def quick_search(request: Dict[str, Any]):
     """Quick search endpoint for web UI"""
@@ -416,278 +627,334 @@ def add_log_entry(message: str):
 # MCP Endpoints
 # =============================================================================
 
-@app.get("/mcp/v1/tools")
-async def list_tools() -> ListToolsResult:
-    """List available MCP tools"""
-    tools = [
-        Tool(
-            name="search_code",
-            description="Semantic search across the C++ codebase. Use this to find code patterns, similar implementations, or concepts.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Natural language description of what to find (e.g., 'database connection loops', 'error handling patterns', 'mutex implementations')"
-                    },
-                    "max_results": {
-                        "type": "integer",
-                        "description": "Maximum number of results to return",
-                        "default": 10
-                    },
-                    "scope": {
-                        "type": "string",
-                        "enum": ["all", "functions", "classes", "files"],
-                        "description": "Limit search to specific code element types",
-                        "default": "all"
-                    }
+# MCP tool definitions; built once at import instead of per discovery
+# request
+TOOLS: List[Tool] = [
+    Tool(
+        name="search_code",
+        description="Semantic search across the C++ codebase. Use this to find code patterns, similar implementations, or concepts.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Natural language description of what to find (e.g., 'database connection loops', 'error handling patterns', 'mutex implementations')"
                 },
-                "required": ["query"]
-            }
-        ),
-        Tool(
-            name="find_symbol",
-            description="Find definition and usages of a specific symbol (class, function, variable). Use for precise lookups.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {
-                        "type": "string",
-                        "description": "Symbol name (can be qualified like 'MyNamespace::MyClass::method' or simple like 'method')"
-                    },
-                    "include_usages": {
-                        "type": "boolean",
-                        "description": "Include all places where this symbol is used",
-                        "default": True
-                    },
-                    "max_usages": {
-                        "type": "integer",
-                        "description": "Maximum number of usage examples to return",
-                        "default": 20
-                    }
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return",
+                    "default": 10
                 },
-                "required": ["symbol"]
-            }
-        ),
-        Tool(
-            name="trace_dependencies",
-            description="Get dependency graph for a symbol or file. Shows what calls/includes/inherits from what.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target": {
-                        "type": "string",
-                        "description": "Symbol or file path to trace dependencies for"
-                    },
-                    "direction": {
-                        "type": "string",
-                        "enum": ["incoming", "outgoing", "both"],
-                        "description": "Direction of dependencies to trace",
-                        "default": "both"
-                    },
-                    "depth": {
-                        "type": "integer",
-                        "description": "How many levels deep to traverse (1-5)",
-                        "default": 2,
-                        "minimum": 1,
-                        "maximum": 5
-                    },
-                    "relationship_types": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Filter by relationship types: calls, inherits, includes, uses",
-                        "default": ["calls", "inherits", "includes"]
-                    }
+                "scope": {
+                    "type": "string",
+                    "enum": ["all", "functions", "classes", "files"],
+                    "description": "Limit search to specific code element types",
+                    "default": "all"
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    Tool(
+        name="find_symbol",
+        description="Find definition and usages of a specific symbol (class, function, variable). Use for precise lookups.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "symbol": {
+                    "type": "string",
+                    "description": "Symbol name (can be qualified like 'MyNamespace::MyClass::method' or simple like 'method')"
                 },
-                "required": ["target"]
-            }
-        ),
-        Tool(
-            name="get_context",
-            description="Get comprehensive context about a component/module/subsystem for agent work. Returns related code organized by relevance.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "component": {
-                        "type": "string",
-                        "description": "Component name, namespace, or module identifier"
-                    },
-                    "detail_level": {
-                        "type": "string",
-                        "enum": ["brief", "detailed", "comprehensive"],
-                        "description": "How much context to gather",
-                        "default": "detailed"
-                    },
-                    "include_related": {
-                        "type": "boolean",
-                        "description": "Include semantically related code from other modules",
-                        "default": True
-                    }
+                "include_usages": {
+                    "type": "boolean",
+                    "description": "Include all places where this symbol is used",
+                    "default": True
                 },
-                "required": ["component"]
-            }
-        ),
-        Tool(
-            name="analyze_debugging_context",
-            description="Analyze Visual Studio debugging context to find crash root cause. Use when you've loaded crash dump in VS, navigated to crash location, and want LLM to analyze the execution path.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "current_file": {
-                        "type": "string",
-                        "description": "Full file path where debugger stopped (from VS status bar or call stack)"
-                    },
-                    "current_line": {
-                        "type": "integer",
-                        "description": "Line number where debugger stopped"
-                    },
-                    "exception_info": {
-                        "type": "string",
-                        "description": "Exception/crash details from VS (e.g., 'Access Violation reading 0x00000000', register values, etc.)"
-                    },
-                    "call_stack": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Call stack from VS Call Stack window (copy entire stack with symbols loaded)"
-                    },
-                    "log_file_content": {
-                        "type": "string",
-                        "description": "Content of application log file (optional but recommended)",
-                        "default": ""
-                    }
+                "max_usages": {
+                    "type": "integer",
+                    "description": "Maximum number of usage examples to return",
+                    "default": 20
+                }
+            },
+            "required": ["symbol"]
+        }
+    ),
+    Tool(
+        name="trace_dependencies",
+        description="Get dependency graph for a symbol or file. Shows what calls/includes/inherits from what.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "target": {
+                    "type": "string",
+                    "description": "Symbol or file path to trace dependencies for"
                 },
-                "required": ["current_file", "current_line", "exception_info", "call_stack"]
-            }
-        ),
-        Tool(
-            name="find_code_location",
-            description="Find code at a specific file and line number. Use when you have a file path and line number from a crash dump or debugger.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "file_path": {
-                        "type": "string",
-                        "description": "File path (can be partial, e.g., 'database_connection.cpp')"
-                    },
-                    "line_number": {
-                        "type": "integer",
-                        "description": "Line number in the file"
-                    }
+                "direction": {
+                    "type": "string",
+                    "enum": ["incoming", "outgoing", "both"],
+                    "description": "Direction of dependencies to trace",
+                    "default": "both"
                 },
-                "required": ["file_path", "line_number"]
-            }
-        ),
-        Tool(
-            name="explain_code",
-            description="Get detailed explanation of a specific code entity with full context. Returns the code plus analysis.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "entity": {
-                        "type": "string",
-                        "description": "Entity identifier (qualified name, file path, or natural language description)"
-                    },
-                    "include_callers": {
-                        "type": "boolean",
-                        "description": "Include information about what calls this code",
-                        "default": True
-                    },
-                    "include_callees": {
-                        "type": "boolean",
-                        "description": "Include information about what this code calls",
-                        "default": True
-                    }
+                "depth": {
+                    "type": "integer",
+                    "description": "How many levels deep to traverse (1-5)",
+                    "default": 2,
+                    "minimum": 1,
+                    "maximum": 5
                 },
-                "required": ["entity"]
-            }
-        )
-    ]
-    
-    return ListToolsResult(tools=tools)
+                "relationship_types": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Filter by relationship types: calls, inherits, includes, uses",
+                    "default": ["calls", "inherits", "includes"]
+                }
+            },
+            "required": ["target"]
+        }
+    ),
+    Tool(
+        name="get_context",
+        description="Get comprehensive context about a component/module/subsystem for agent work. Returns related code organized by relevance.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "component": {
+                    "type": "string",
+                    "description": "Component name, namespace, or module identifier"
+                },
+                "detail_level": {
+                    "type": "string",
+                    "enum": ["brief", "detailed", "comprehensive"],
+                    "description": "How much context to gather",
+                    "default": "detailed"
+                },
+                "include_related": {
+                    "type": "boolean",
+                    "description": "Include semantically related code from other modules",
+                    "default": True
+                }
+            },
+            "required": ["component"]
+        }
+    ),
+    Tool(
+        name="analyze_debugging_context",
+        description="Analyze Visual Studio debugging context to find crash root cause. Use when you've loaded crash dump in VS, navigated to crash location, and want LLM to analyze the execution path.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "current_file": {
+                    "type": "string",
+                    "description": "Full file path where debugger stopped (from VS status bar or call stack)"
+                },
+                "current_line": {
+                    "type": "integer",
+                    "description": "Line number where debugger stopped"
+                },
+                "exception_info": {
+                    "type": "string",
+                    "description": "Exception/crash details from VS (e.g., 'Access Violation reading 0x00000000', register values, etc.)"
+                },
+                "call_stack": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Call stack from VS Call Stack window (copy entire stack with symbols loaded)"
+                },
+                "log_file_content": {
+                    "type": "string",
+                    "description": "Content of application log file (optional but recommended)",
+                    "default": ""
+                }
+            },
+            "required": ["current_file", "current_line", "exception_info", "call_stack"]
+        }
+    ),
+    Tool(
+        name="find_code_location",
+        description="Find code at a specific file and line number. Use when you have a file path and line number from a crash dump or debugger.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "file_path": {
+                    "type": "string",
+                    "description": "File path (can be partial, e.g., 'database_connection.cpp')"
+                },
+                "line_number": {
+                    "type": "integer",
+                    "description": "Line number in the file"
+                }
+            },
+            "required": ["file_path", "line_number"]
+        }
+    ),
+    Tool(
+        name="explain_code",
+        description="Get detailed explanation of a specific code entity with full context. Returns the code plus analysis.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "entity": {
+                    "type": "string",
+                    "description": "Entity identifier (qualified name, file path, or natural language description)"
+                },
+                "include_callers": {
+                    "type": "boolean",
+                    "description": "Include information about what calls this code",
+                    "default": True
+                },
+                "include_callees": {
+                    "type": "boolean",
+                    "description": "Include information about what this code calls",
+                    "default": True
+                }
+            },
+            "required": ["entity"]
+        }
+    ),
+    Tool(
+        name="get_full_chunk",
+        description="Retrieve the full, untruncated content of a code chunk returned by search_code (results there are truncated to 2000 characters).",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "chunk_id": {
+                    "type": "integer",
+                    "description": "Chunk id from a search_code result"
+                }
+            },
+            "required": ["chunk_id"]
+        }
+    )
+]
+
+_TOOLS_RESULT = ListToolsResult(tools=TOOLS)
+
+@app.get("/mcp/v1/tools")
+async def list_tools() -> ListToolsResult:
+    """List available MCP tools"""
+    return _TOOLS_RESULT
 
 @app.post("/mcp/v1/tools/call")
-async def call_tool(request: CallToolRequest) -> CallToolResult:
+async def call_tool(request: CallToolRequest):
     """Execute an MCP tool"""
+    # The result dict is built directly instead of through CallToolResult so
+    # the response skips Pydantic validation and goes straight to orjson
     try:
-        if request.name == "search_code":
-            result = await search_code(
-                query=request.arguments["query"],
-                max_results=request.arguments.get("max_results", 10),
-                scope=request.arguments.get("scope", "all")
-            )
-        elif request.name == "find_symbol":
-            result = await find_symbol(
-                symbol=request.arguments["symbol"],
-                include_usages=request.arguments.get("include_usages", True),
-                max_usages=request.arguments.get("max_usages", 20)
-            )
-        elif request.name == "trace_dependencies":
-            result = await trace_dependencies(
-                target=request.arguments["target"],
-                direction=request.arguments.get("direction", "both"),
-                depth=request.arguments.get("depth", 2),
-                relationship_types=request.arguments.get("relationship_types", ["calls", "inherits", "includes"])
-            )
-        elif request.name == "get_context":
-            result = await get_context(
-                component=request.arguments["component"],
-                detail_level=request.arguments.get("detail_level", "detailed"),
-                include_related=request.arguments.get("include_related", True)
-            )
-        elif request.name == "analyze_debugging_context":
-            result = await analyze_debugging_context_tool(
-                current_file=request.arguments["current_file"],
-                current_line=request.arguments["current_line"],
-                exception_info=request.arguments["exception_info"],
-                call_stack=request.arguments["call_stack"],
-                log_file_content=request.arguments.get("log_file_content", "")
-            )
-        elif request.name == "find_code_location":
-            result = await find_code_location_tool(
-                file_path=request.arguments["file_path"],
-                line_number=request.arguments["line_number"]
-            )
-        elif request.name == "explain_code":
-            result = await explain_code(
-                entity=request.arguments["entity"],
-                include_callers=request.arguments.get("include_callers", True),
-                include_callees=request.arguments.get("include_callees", True)
-            )
-        else:
+        entry = TOOL_REGISTRY.get(request.name)
+        if entry is None:
             raise HTTPException(status_code=404, detail=f"Tool '{request.name}' not found")
-        
-        return CallToolResult(content=[{"type": "text", "text": json.dumps(result, indent=2)}])
-    
+
+        handler, arg_names, defaults = entry
+        # Known arguments over their defaults; unknown keys are ignored as
+        # the old per-tool unpacking did
+        kwargs = dict(defaults)
+        for name in arg_names:
+            if name in request.arguments:
+                kwargs[name] = request.arguments[name]
+        result = await handler(**kwargs)
+
+        return _response_class({
+            "content": [{"type": "text", "text": _dumps_result(result)}],
+            "isError": False
+        })
+
     except Exception as e:
-        return CallToolResult(
-            content=[{"type": "text", "text": f"Error executing tool: {str(e)}"}],
-            isError=True
-        )
+        return _response_class({
+            "content": [{"type": "text", "text": f"Error executing tool: {str(e)}"}],
+            "isError": True
+        })
 
 # =============================================================================
 # Tool Implementations
 # =============================================================================
 
-async def search_code(query: str, max_results: int, scope: str) -> Dict[str, Any]:
-    """Semantic search implementation"""
-    # Generate query embedding
-    query_embedding = embedding_model.encode(query).tolist()
-    query_embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-    
-    # Build scope filter
-    scope_filter = ""
-    if scope == "functions":
-        scope_filter = "AND e.type = 'function'"
-    elif scope == "classes":
-        scope_filter = "AND e.type IN ('class', 'struct')"
-    elif scope == "files":
-        scope_filter = "AND c.entity_id IS NULL"  # File-level chunks
-    
-    # Search using cosine similarity
-    sql = f"""
-        SELECT 
+class _BatchedEncoder:
+    """
+    Coalesces concurrent query encodes into a single model pass.
+
+    MCP clients often fire search_code and get_context in parallel for the
+    same concept; draining the requests that arrive within a few
+    milliseconds as one batch amortizes the model's per-call overhead.
+    Repeated queries are served from a small LRU cache without touching
+    the model at all.
+    """
+
+    CACHE_MAX_ENTRIES = 4096
+
+    def __init__(self, window_ms: float = 3.0, max_batch: int = 32):
+        self._window_s = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._pending: List[tuple] = []  # (text, future)
+        self._flush_task: Optional[asyncio.Task] = None
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    async def encode(self, text: str) -> np.ndarray:
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self._max_batch:
+            # Full batch: run it now instead of waiting out the window
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+                self._flush_task = None
+            loop.create_task(self._run_batch())
+        elif self._flush_task is None:
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+        return await future
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self._window_s)
+        self._flush_task = None
+        await self._run_batch()
+
+    async def _run_batch(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = await asyncio.to_thread(
+                embedding_model.encode,
+                texts,
+                batch_size=self._max_batch,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (text, future), row in zip(batch, embeddings):
+            embedding = np.asarray(row, dtype=np.float32)
+            if len(self._cache) >= self.CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+            self._cache[text] = embedding
+            if not future.done():
+                future.set_result(embedding)
+
+_query_encoder = _BatchedEncoder()
+
+# The four fixed-shape scope variants of the search SQL, built once so
+# each stays a stable string that asyncpg's statement cache can reuse.
+# ts_headline pulls the fragments around the query terms ('simple'
+# config, since code identifiers should not be stemmed); it only runs
+# over the LIMIT rows, not the whole table
+_SEARCH_SQL = {
+    scope: f"""
+        SELECT
             c.id,
-            c.content,
+            LEFT(c.content, 2000) AS content,
+            ts_headline('simple', c.content, plainto_tsquery('simple', $3),
+                        'MaxFragments=2, MinWords=5, MaxWords=25') AS excerpt,
             c.start_line,
             c.end_line,
             c.chunk_type,
@@ -695,18 +962,33 @@ async def search_code(query: str, max_results: int, scope: str) -> Dict[str, Any
             f.path as file_path,
             e.qualified_name,
             e.type as entity_type,
-            1 - (c.embedding <=> $1::vector) as similarity
+            1 - (c.embedding <=> $1) as similarity
         FROM code_chunks c
         JOIN files f ON c.file_id = f.id
         LEFT JOIN entities e ON c.entity_id = e.id
         WHERE c.embedding IS NOT NULL
         {scope_filter}
-        ORDER BY c.embedding <=> $1::vector
+        ORDER BY c.embedding <=> $1
         LIMIT $2
     """
-    
+    for scope, scope_filter in {
+        "all": "",
+        "functions": "AND e.type = 'function'",
+        "classes": "AND e.type IN ('class', 'struct')",
+        "files": "AND c.entity_id IS NULL",  # File-level chunks
+    }.items()
+}
+
+async def search_code(query: str, max_results: int, scope: str) -> Dict[str, Any]:
+    """Semantic search implementation"""
+    # Generate query embedding; the pgvector codec sends it in binary form
+    query_embedding = await _query_encoder.encode(query)
+
+    # Search using cosine similarity
+    sql = _SEARCH_SQL.get(scope, _SEARCH_SQL["all"])
+
     async with db_pool.acquire() as conn:
-        rows = await conn.fetch(sql, query_embedding_str, max_results)
+        rows = await conn.fetch(sql, query_embedding, max_results, query)
     
     results = []
     for row in rows:
@@ -715,9 +997,11 @@ async def search_code(query: str, max_results: int, scope: str) -> Dict[str, Any
             "entity": row["qualified_name"],
             "type": row["entity_type"],
             "content": row["content"],
+            "excerpt": row["excerpt"],
             "lines": f"{row['start_line']}-{row['end_line']}" if row["start_line"] else "N/A",
             "similarity": float(row["similarity"]),
-            "chunk_type": row["chunk_type"]
+            "chunk_type": row["chunk_type"],
+            "chunk_id": row["id"]
         })
     
     return {
@@ -726,29 +1010,42 @@ async def search_code(query: str, max_results: int, scope: str) -> Dict[str, Any
         "results": results
     }
 
+async def get_full_chunk(chunk_id: int) -> Dict[str, Any]:
+    """Fetch the untruncated content of a single chunk by id"""
+    async with db_pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            SELECT
+                c.content,
+                c.start_line,
+                c.end_line,
+                c.chunk_type,
+                f.path as file_path,
+                e.qualified_name
+            FROM code_chunks c
+            JOIN files f ON c.file_id = f.id
+            LEFT JOIN entities e ON c.entity_id = e.id
+            WHERE c.id = $1
+        """, chunk_id)
+
+    if not row:
+        return {"error": f"Chunk {chunk_id} not found"}
+
+    return {
+        "chunk_id": chunk_id,
+        "file": row["file_path"],
+        "entity": row["qualified_name"],
+        "content": row["content"],
+        "lines": f"{row['start_line']}-{row['end_line']}" if row["start_line"] else "N/A",
+        "chunk_type": row["chunk_type"]
+    }
+
 async def find_symbol(symbol: str, include_usages: bool, max_usages: int) -> Dict[str, Any]:
     """Find symbol definition and usages"""
-    # Find the entity
-    sql = """
-        SELECT 
-            e.id,
-            e.type,
-            e.qualified_name,
-            e.signature,
-            e.start_line,
-            e.end_line,
-            f.path as file_path,
-            e.complexity_score,
-            e.metadata
-        FROM entities e
-        JOIN files f ON e.file_id = f.id
-        WHERE e.qualified_name LIKE $1 OR e.simple_name = $2
-        LIMIT 10
-    """
-    
+    # Resolution and ranking live in the server-side find_entity function,
+    # shared with the other lookup tools
     async with db_pool.acquire() as conn:
-        entities = await conn.fetch(sql, f"%{symbol}%", symbol)
-        
+        entities = await conn.fetch("SELECT * FROM find_entity($1)", symbol)
+
         if not entities:
             return {"error": f"Symbol '{symbol}' not found"}
         
@@ -765,37 +1062,38 @@ async def find_symbol(symbol: str, include_usages: bool, max_usages: int) -> Dic
             "complexity": entity["complexity_score"]
         }
         
-        # Get the code
-        code_sql = """
-            SELECT content
-            FROM code_chunks
-            WHERE entity_id = $1
-            ORDER BY start_line
-            LIMIT 1
-        """
-        code_row = await conn.fetchrow(code_sql, entity_id)
-        if code_row:
-            result["code"] = code_row["content"]
-        
+        # Get the code and (optionally) incoming usages in one round trip;
+        # the usage rows come back as a JSON aggregate
+        combined = await conn.fetchrow("""
+            SELECT
+                (SELECT content
+                 FROM code_chunks
+                 WHERE entity_id = $1
+                 ORDER BY start_line
+                 LIMIT 1) AS code,
+                (SELECT json_agg(u)
+                 FROM (
+                    SELECT
+                        e.qualified_name as caller,
+                        e.type as caller_type,
+                        f.path as file_path,
+                        r.relationship_type,
+                        r.context,
+                        r.line_number
+                    FROM relationships r
+                    JOIN entities e ON r.from_entity_id = e.id
+                    JOIN files f ON e.file_id = f.id
+                    WHERE r.to_entity_id = $1 AND $3
+                    ORDER BY f.path, r.line_number
+                    LIMIT $2
+                 ) u) AS usages
+        """, entity_id, max_usages, include_usages)
+        if combined["code"] is not None:
+            result["code"] = combined["code"]
+
         if include_usages:
-            # Find incoming relationships (who uses this)
-            usages_sql = """
-                SELECT 
-                    e.qualified_name as caller,
-                    e.type as caller_type,
-                    f.path as file_path,
-                    r.relationship_type,
-                    r.context,
-                    r.line_number
-                FROM relationships r
-                JOIN entities e ON r.from_entity_id = e.id
-                JOIN files f ON e.file_id = f.id
-                WHERE r.to_entity_id = $1
-                ORDER BY f.path, r.line_number
-                LIMIT $2
-            """
-            usage_rows = await conn.fetch(usages_sql, entity_id, max_usages)
-            
+            usage_rows = json.loads(combined["usages"]) if combined["usages"] else []
+
             result["usages"] = [
                 {
                     "caller": row["caller"],
@@ -821,13 +1119,10 @@ async def find_symbol(symbol: str, include_usages: bool, max_usages: int) -> Dic
 async def trace_dependencies(target: str, direction: str, depth: int, relationship_types: List[str]) -> Dict[str, Any]:
     """Trace dependency graph"""
     async with db_pool.acquire() as conn:
-        # Find the target entity
-        entity = await conn.fetchrow("""
-            SELECT id, qualified_name, type, file_id
-            FROM entities
-            WHERE qualified_name LIKE $1 OR simple_name = $2
-            LIMIT 1
-        """, f"%{target}%", target)
+        # Find the target entity via the shared resolver
+        entity = await conn.fetchrow(
+            "SELECT id, qualified_name, type, file_id FROM find_entity($1, 1)",
+            target)
         
         if not entity:
             return {"error": f"Target '{target}' not found"}
@@ -839,74 +1134,81 @@ async def trace_dependencies(target: str, direction: str, depth: int, relationsh
             "outgoing": []
         }
         
-        # Get outgoing dependencies (what this calls/uses)
-        if direction in ["outgoing", "both"]:
-            outgoing = await conn.fetch("""
-                SELECT DISTINCT
-                    e.qualified_name,
-                    e.type,
-                    r.relationship_type,
-                    f.path as file_path
-                FROM relationships r
-                JOIN entities e ON r.to_entity_id = e.id
-                JOIN files f ON e.file_id = f.id
-                WHERE r.from_entity_id = $1
-                AND r.relationship_type = ANY($2)
-                LIMIT 50
-            """, entity["id"], relationship_types)
-            
-            result["outgoing"] = [
-                {
-                    "name": row["qualified_name"],
-                    "type": row["type"],
-                    "relationship": row["relationship_type"],
-                    "file": row["file_path"]
-                }
-                for row in outgoing
-            ]
-        
-        # Get incoming dependencies (what calls/uses this)
-        if direction in ["incoming", "both"]:
-            incoming = await conn.fetch("""
-                SELECT DISTINCT
-                    e.qualified_name,
-                    e.type,
-                    r.relationship_type,
-                    f.path as file_path
-                FROM relationships r
-                JOIN entities e ON r.from_entity_id = e.id
-                JOIN files f ON e.file_id = f.id
-                WHERE r.to_entity_id = $1
-                AND r.relationship_type = ANY($2)
-                LIMIT 50
-            """, entity["id"], relationship_types)
-            
-            result["incoming"] = [
-                {
-                    "name": row["qualified_name"],
-                    "type": row["type"],
-                    "relationship": row["relationship_type"],
-                    "file": row["file_path"]
-                }
-                for row in incoming
-            ]
-        
+        # DISTINCT ON walks the composite relationship index in order
+        # instead of hash-aggregating every matching row
+        outgoing_sql = """
+            SELECT DISTINCT ON (e.id, r.relationship_type)
+                e.qualified_name,
+                e.type,
+                r.relationship_type,
+                f.path as file_path
+            FROM relationships r
+            JOIN entities e ON r.to_entity_id = e.id
+            JOIN files f ON e.file_id = f.id
+            WHERE r.from_entity_id = $1
+            AND r.relationship_type = ANY($2)
+            ORDER BY e.id, r.relationship_type
+            LIMIT 50
+        """
+        incoming_sql = """
+            SELECT DISTINCT ON (e.id, r.relationship_type)
+                e.qualified_name,
+                e.type,
+                r.relationship_type,
+                f.path as file_path
+            FROM relationships r
+            JOIN entities e ON r.from_entity_id = e.id
+            JOIN files f ON e.file_id = f.id
+            WHERE r.to_entity_id = $1
+            AND r.relationship_type = ANY($2)
+            ORDER BY e.id, r.relationship_type
+            LIMIT 50
+        """
+
+        # The two directions are independent; run them concurrently on
+        # separate pooled connections when both are requested
+        outgoing: List = []
+        incoming: List = []
+        if direction == "both":
+            async with db_pool.acquire() as conn2:
+                outgoing, incoming = await asyncio.gather(
+                    conn.fetch(outgoing_sql, entity["id"], relationship_types),
+                    conn2.fetch(incoming_sql, entity["id"], relationship_types)
+                )
+        elif direction == "outgoing":
+            outgoing = await conn.fetch(outgoing_sql, entity["id"], relationship_types)
+        elif direction == "incoming":
+            incoming = await conn.fetch(incoming_sql, entity["id"], relationship_types)
+
+        result["outgoing"] = [
+            {
+                "name": row["qualified_name"],
+                "type": row["type"],
+                "relationship": row["relationship_type"],
+                "file": row["file_path"]
+            }
+            for row in outgoing
+        ]
+        result["incoming"] = [
+            {
+                "name": row["qualified_name"],
+                "type": row["type"],
+                "relationship": row["relationship_type"],
+                "file": row["file_path"]
+            }
+            for row in incoming
+        ]
+
         return result
 
 async def get_context(component: str, detail_level: str, include_related: bool) -> Dict[str, Any]:
     """Get comprehensive context about a component"""
     async with db_pool.acquire() as conn:
-        # Find entities matching the component
+        # Find entities matching the component via the shared resolver
         entities = await conn.fetch("""
-            SELECT 
-                e.id, e.qualified_name, e.type, e.signature,
-                e.start_line, e.end_line, f.path as file_path
-            FROM entities e
-            JOIN files f ON e.file_id = f.id
-            WHERE e.qualified_name ILIKE $1
-            ORDER BY e.type, e.qualified_name
-            LIMIT 20
-        """, f"%{component}%")
+            SELECT * FROM find_entity($1, 20)
+            ORDER BY type, qualified_name
+        """, component)
         
         if not entities:
             return {"error": f"Component '{component}' not found"}
@@ -917,6 +1219,18 @@ async def get_context(component: str, detail_level: str, include_related: bool)
             "related_code": []
         }
         
+        # One bulk query for every entity's code instead of a fetch per
+        # entity (up to 20 serial round-trips)
+        code_by_id = {}
+        if detail_level in ["detailed", "comprehensive"]:
+            code_rows = await conn.fetch("""
+                SELECT DISTINCT ON (entity_id) entity_id, content
+                FROM code_chunks
+                WHERE entity_id = ANY($1::int[])
+                ORDER BY entity_id
+            """, [entity["id"] for entity in entities])
+            code_by_id = {row["entity_id"]: row["content"] for row in code_rows}
+
         for entity in entities:
             entity_info = {
                 "name": entity["qualified_name"],
@@ -925,33 +1239,27 @@ async def get_context(component: str, detail_level: str, include_related: bool)
                 "file": entity["file_path"],
                 "lines": f"{entity['start_line']}-{entity['end_line']}"
             }
-            
-            if detail_level in ["detailed", "comprehensive"]:
-                # Get code
-                code = await conn.fetchval("""
-                    SELECT content FROM code_chunks
-                    WHERE entity_id = $1
-                    LIMIT 1
-                """, entity["id"])
-                if code:
-                    entity_info["code"] = code
-            
+
+            code = code_by_id.get(entity["id"])
+            if code:
+                entity_info["code"] = code
+
             result["entities"].append(entity_info)
         
         # Get related code via semantic search
         if include_related:
-            query_embedding = embedding_model.encode(component).tolist()
+            query_embedding = await _query_encoder.encode(component)
             related = await conn.fetch("""
-                SELECT 
-                    c.content,
+                SELECT
+                    LEFT(c.content, 500) AS content,
                     f.path as file_path,
                     e.qualified_name,
-                    1 - (c.embedding <=> $1::vector) as similarity
+                    1 - (c.embedding <=> $1) as similarity
                 FROM code_chunks c
                 JOIN files f ON c.file_id = f.id
                 LEFT JOIN entities e ON c.entity_id = e.id
                 WHERE c.embedding IS NOT NULL
-                ORDER BY c.embedding <=> $1::vector
+                ORDER BY c.embedding <=> $1
                 LIMIT 5
             """, query_embedding)
             
@@ -960,7 +1268,7 @@ async def get_context(component: str, detail_level: str, include_related: bool)
                     "name": row["qualified_name"],
                     "file": row["file_path"],
                     "similarity": float(row["similarity"]),
-                    "snippet": row["content"][:500]
+                    "snippet": row["content"]
                 }
                 for row in related
             ]
@@ -988,11 +1296,12 @@ async def analyze_debugging_context_tool(
     )
     
     # Format response for better readability
+    execution_path = result.get("execution_path", [])
     response = {
         "summary": f"Analyzed crash at {current_file}:{current_line}",
         "crash_location": result.get("crash_location", {}),
         "execution_path_analysis": {
-            "total_frames": len(result.get("execution_path", [])),
+            "total_frames": len(execution_path),
             "frames_with_code": [
                 {
                     "function": frame["entity"],
@@ -1000,7 +1309,7 @@ async def analyze_debugging_context_tool(
                     "lines": frame["lines"],
                     "code_snippet": frame["code"][:500] if frame.get("code") else "Not found in codebase"
                 }
-                for frame in result.get("execution_path", [])
+                for frame in execution_path
             ]
         },
         "root_cause_hypotheses": result.get("root_cause_hypothesis", []),
@@ -1025,52 +1334,64 @@ async def analyze_debugging_context_tool(
 
 def _generate_analysis_summary(analysis: Dict) -> str:
     """Generate human-readable summary"""
-    parts = []
-    
     # Crash location
     crash_loc = analysis.get("crash_location", {})
     if crash_loc:
-        parts.append(
+        loc_part = (
             f"Crash occurred in {crash_loc.get('entity', 'unknown')} "
             f"at {crash_loc.get('file')}:{crash_loc.get('line')}"
         )
-        parts.append(f"Exception: {crash_loc.get('exception')}")
-    
+        exc_part = f"Exception: {crash_loc.get('exception')}"
+    else:
+        loc_part = exc_part = None
+
     # Execution path
     exec_path = analysis.get("execution_path_analysis", {})
-    if exec_path.get("total_frames"):
-        parts.append(
-            f"Found code for {len(exec_path.get('frames_with_code', []))} "
-            f"out of {exec_path['total_frames']} stack frames in your codebase"
-        )
-    
-    # Root cause hypotheses
-    hypotheses = analysis.get("root_cause_hypotheses", [])
-    if hypotheses:
-        high_priority = [h for h in hypotheses if h.get("priority") == "HIGH" or h.get("priority") == "CRITICAL"]
-        if high_priority:
-            parts.append(f"Top hypothesis: {high_priority[0]['hypothesis']}")
-    
+    frames_part = (
+        f"Found code for {len(exec_path.get('frames_with_code', []))} "
+        f"out of {exec_path['total_frames']} stack frames in your codebase"
+    ) if exec_path.get("total_frames") else None
+
+    # Root cause hypotheses: first HIGH/CRITICAL one, if any
+    hyp_part = None
+    for h in analysis.get("root_cause_hypotheses", []):
+        if h.get("priority") in ("HIGH", "CRITICAL"):
+            hyp_part = f"Top hypothesis: {h['hypothesis']}"
+            break
+
     # Log insights
-    log_insights = analysis.get("log_insights", {})
-    if log_insights.get("errors_before_crash"):
-        parts.append(f"Found {len(log_insights['errors_before_crash'])} errors in log before crash")
-    
-    return ". ".join(parts) + "."
+    errors = analysis.get("log_insights", {}).get("errors_before_crash")
+    log_part = f"Found {len(errors)} errors in log before crash" if errors else None
+
+    return ". ".join(
+        filter(None, (loc_part, exc_part, frames_part, hyp_part, log_part))
+    ) + "."
+
+# Crash analyses re-query the same (file, line) pairs across LLM turns, one
+# per stack frame; entity ranges only move when a file is re-indexed, so a
+# short TTL is safe and index_files clears the cache anyway
+_LOC_CACHE: Dict[tuple, tuple] = {}
+_LOC_CACHE_TTL = 300.0
+_LOC_CACHE_MAX = 2048
 
 async def find_code_location_tool(file_path: str, line_number: int) -> Dict[str, Any]:
     """Find code at specific location"""
     from crash_analyzer import find_code_at_location
-    
+
+    key = (file_path, line_number)
+    cached = _LOC_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[1] < _LOC_CACHE_TTL:
+        return cached[0]
+
     result = await find_code_at_location(file_path, line_number, db_pool)
-    
+
     if not result:
         return {
             "error": f"No code found at {file_path}:{line_number}",
             "suggestion": "Check if the file path is correct and if the code has been indexed"
         }
-    
-    return {
+
+    response = {
         "location": f"{result['file_path']}:{line_number}",
         "entity": {
             "name": result['qualified_name'],
@@ -1082,20 +1403,17 @@ async def find_code_location_tool(file_path: str, line_number: int) -> Dict[str,
         "context": f"This location is inside {result['type']} '{result['qualified_name']}'"
     }
 
+    if len(_LOC_CACHE) >= _LOC_CACHE_MAX:
+        _LOC_CACHE.clear()
+    _LOC_CACHE[key] = (response, time.monotonic())
+    return response
+
 async def explain_code(entity: str, include_callers: bool, include_callees: bool) -> Dict[str, Any]:
     """Get detailed code explanation"""
     async with db_pool.acquire() as conn:
-        # Find the entity
-        entity_row = await conn.fetchrow("""
-            SELECT 
-                e.id, e.qualified_name, e.type, e.signature,
-                e.start_line, e.end_line, e.complexity_score,
-                f.path as file_path
-            FROM entities e
-            JOIN files f ON e.file_id = f.id
-            WHERE e.qualified_name LIKE $1 OR e.simple_name = $2
-            LIMIT 1
-        """, f"%{entity}%", entity)
+        # Find the entity via the shared resolver
+        entity_row = await conn.fetchrow(
+            "SELECT * FROM find_entity($1, 1)", entity)
         
         if not entity_row:
             return {"error": f"Entity '{entity}' not found"}
@@ -1109,92 +1427,299 @@ async def explain_code(entity: str, include_callers: bool, include_callees: bool
             "complexity": entity_row["complexity_score"]
         }
         
-        # Get the code
-        code = await conn.fetchval("""
+        # DISTINCT ON (e.id) dedupes via the composite relationship index
+        # rather than a hash-agg over every call site
+        callers_sql = """
+            SELECT DISTINCT ON (e.id) e.qualified_name, e.type, f.path
+            FROM relationships r
+            JOIN entities e ON r.from_entity_id = e.id
+            JOIN files f ON e.file_id = f.id
+            WHERE r.to_entity_id = $1 AND r.relationship_type = 'calls'
+            ORDER BY e.id
+            LIMIT 20
+        """
+        callees_sql = """
+            SELECT DISTINCT ON (e.id) e.qualified_name, e.type, f.path
+            FROM relationships r
+            JOIN entities e ON r.to_entity_id = e.id
+            JOIN files f ON e.file_id = f.id
+            WHERE r.from_entity_id = $1 AND r.relationship_type = 'calls'
+            ORDER BY e.id
+            LIMIT 20
+        """
+
+        async def fetch_on_own_conn(sql: str, entity_id: int):
+            """Run a caller/callee fetch on its own pooled connection"""
+            async with db_pool.acquire() as c:
+                return await c.fetch(sql, entity_id)
+
+        # Code, callers and callees are independent; fetch them concurrently
+        tasks = [conn.fetchval("""
             SELECT content FROM code_chunks
             WHERE entity_id = $1
             LIMIT 1
-        """, entity_row["id"])
-        
+        """, entity_row["id"])]
+        if include_callers:
+            tasks.append(fetch_on_own_conn(callers_sql, entity_row["id"]))
+        if include_callees:
+            tasks.append(fetch_on_own_conn(callees_sql, entity_row["id"]))
+        fetched = await asyncio.gather(*tasks)
+
+        code = fetched[0]
         if code:
             result["code"] = code
-        
-        # Get callers
+
+        next_result = 1
         if include_callers:
-            callers = await conn.fetch("""
-                SELECT DISTINCT e.qualified_name, e.type, f.path
-                FROM relationships r
-                JOIN entities e ON r.from_entity_id = e.id
-                JOIN files f ON e.file_id = f.id
-                WHERE r.to_entity_id = $1 AND r.relationship_type = 'calls'
-                LIMIT 20
-            """, entity_row["id"])
+            callers = fetched[next_result]
+            next_result += 1
             result["callers"] = [
                 {"name": c["qualified_name"], "type": c["type"], "file": c["path"]}
                 for c in callers
             ]
-        
-        # Get callees
+
         if include_callees:
-            callees = await conn.fetch("""
-                SELECT DISTINCT e.qualified_name, e.type, f.path
-                FROM relationships r
-                JOIN entities e ON r.to_entity_id = e.id
-                JOIN files f ON e.file_id = f.id
-                WHERE r.from_entity_id = $1 AND r.relationship_type = 'calls'
-                LIMIT 20
-            """, entity_row["id"])
+            callees = fetched[next_result]
             result["callees"] = [
                 {"name": c["qualified_name"], "type": c["type"], "file": c["path"]}
                 for c in callees
             ]
-        
+
         return result
 
+# Tool dispatch table: handler, accepted argument names and defaults.
+# Defaults mirror the ones advertised in the TOOLS schemas.
+TOOL_REGISTRY: Dict[str, tuple] = {
+    "search_code": (
+        search_code,
+        ("query", "max_results", "scope"),
+        {"max_results": 10, "scope": "all"}
+    ),
+    "find_symbol": (
+        find_symbol,
+        ("symbol", "include_usages", "max_usages"),
+        {"include_usages": True, "max_usages": 20}
+    ),
+    "trace_dependencies": (
+        trace_dependencies,
+        ("target", "direction", "depth", "relationship_types"),
+        {"direction": "both", "depth": 2,
+         "relationship_types": ["calls", "inherits", "includes"]}
+    ),
+    "get_context": (
+        get_context,
+        ("component", "detail_level", "include_related"),
+        {"detail_level": "detailed", "include_related": True}
+    ),
+    "analyze_debugging_context": (
+        analyze_debugging_context_tool,
+        ("current_file", "current_line", "exception_info", "call_stack",
+         "log_file_content"),
+        {"log_file_content": ""}
+    ),
+    "find_code_location": (
+        find_code_location_tool,
+        ("file_path", "line_number"),
+        {}
+    ),
+    "explain_code": (
+        explain_code,
+        ("entity", "include_callers", "include_callees"),
+        {"include_callers": True, "include_callees": True}
+    ),
+    "get_full_chunk": (
+        get_full_chunk,
+        ("chunk_id",),
+        {}
+    ),
+}
+
 # =============================================================================
 # File Monitoring and Indexing
 # =============================================================================
 
+# "watch" uses filesystem events (inotify on Linux), so steady-state cost
+# is proportional to churn instead of repo size; "poll" keeps the old
+# 30-second rglob sweep as a fallback
+MONITOR_MODE = os.getenv("MONITOR_MODE", "watch")
+_CPP_SUFFIXES = (".cpp", ".cc", ".cxx", ".hpp", ".h", ".hxx")
+_CPP_EXTENSIONS = frozenset(_CPP_SUFFIXES)
+
+
+def _iter_cpp_files(root: Path):
+    """Walk a tree once with scandir, yielding DirEntry objects for C++
+    files; one pass instead of an rglob per extension, and d_type from
+    the directory listing avoids a stat call per entry"""
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(_CPP_SUFFIXES) and entry.is_file():
+                        yield entry
+        except OSError:
+            continue
+_watch_observer = None
+_watch_handler = None
+
+
+class _ChangeEventHandler(FileSystemEventHandler):
+    """Pushes relevant filesystem events onto the monitor's asyncio queue"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self._loop = loop
+        self._queue = queue
+
+    def on_created(self, event):
+        self._enqueue(event)
+
+    def on_modified(self, event):
+        self._enqueue(event)
+
+    def on_moved(self, event):
+        self._enqueue(event)
+
+    def _enqueue(self, event):
+        if event.is_directory:
+            return
+        # Watchdog callbacks run on the observer thread; hand the path to
+        # the event loop thread-safely
+        path = getattr(event, "dest_path", "") or event.src_path
+        if Path(path).suffix.lower() in _CPP_EXTENSIONS:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, path)
+
+
+def _schedule_watches():
+    """(Re)attach recursive watches to the current monitoring paths"""
+    if _watch_observer is None or _watch_handler is None:
+        return
+    _watch_observer.unschedule_all()
+    for base_path in monitoring_paths:
+        if base_path.exists():
+            _watch_observer.schedule(_watch_handler, str(base_path), recursive=True)
+
+
 async def file_monitor_loop():
-    """Monitor directories for changes every 30 seconds"""
+    """Monitor directories for changes via filesystem events (or polling)"""
+    global _watch_observer, _watch_handler
+
     await asyncio.sleep(5)  # Wait for initial indexing to start
-    
+
+    if MONITOR_MODE == "poll":
+        while True:
+            try:
+                await asyncio.sleep(30)
+                print("Checking for file changes...")
+                await check_for_changes()
+            except Exception as e:
+                print(f"Error in file monitor: {e}")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    _watch_handler = _ChangeEventHandler(asyncio.get_running_loop(), queue)
+    _watch_observer = Observer()
+    _schedule_watches()
+    _watch_observer.start()
+    print("File monitor watching for filesystem events")
+
     while True:
         try:
-            await asyncio.sleep(30)
-            print("Checking for file changes...")
-            await check_for_changes()
+            # Block until something changes, then coalesce the burst of
+            # events an editor/save or checkout produces into one batch
+            pending = {await queue.get()}
+            while True:
+                try:
+                    pending.add(await asyncio.wait_for(queue.get(), timeout=0.3))
+                except asyncio.TimeoutError:
+                    break
+
+            changed_files = [Path(p) for p in pending if Path(p).is_file()]
+            if changed_files:
+                print(f"Detected {len(changed_files)} changed files, starting incremental indexing...")
+                await index_files(changed_files)
         except Exception as e:
             print(f"Error in file monitor: {e}")
 
 async def check_for_changes():
     """Check monitored directories for changes"""
     changed_files = []
-    
+
+    # Walk the tree first, collecting every candidate with its stat
+    candidates: List[tuple] = []  # (Path, os.stat_result)
     for base_path in monitoring_paths:
         if not base_path.exists():
             continue
-        
-        # Find all C++ files
-        for ext in ["*.cpp", "*.cc", "*.cxx", "*.hpp", "*.h", "*.hxx"]:
-            for file_path in base_path.rglob(ext):
-                if file_path.is_file():
-                    # Calculate file hash
-                    content_hash = calculate_file_hash(file_path)
-                    
-                    # Check if file exists in DB and if hash changed
-                    async with db_pool.acquire() as conn:
-                        row = await conn.fetchrow(
-                            "SELECT id, content_hash FROM files WHERE path = $1",
-                            str(file_path)
-                        )
-                        
-                        if not row:
-                            # New file
-                            changed_files.append(file_path)
-                        elif row["content_hash"] != content_hash:
-                            # Modified file
-                            changed_files.append(file_path)
+
+        # Single tree walk; the DirEntry carries the stat result
+        for entry in _iter_cpp_files(base_path):
+            candidates.append((Path(entry.path), entry.stat()))
+
+    if not candidates:
+        print("No changes detected")
+        return
+
+    # One round trip for every file's stored state instead of a pool
+    # acquisition and SELECT per file
+    async with db_pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT id, path, content_hash, mtime_ns, size FROM files WHERE path = ANY($1::text[])",
+            [str(file_path) for file_path, _ in candidates]
+        )
+    state_by_path = {row["path"]: row for row in rows}
+    # Set-diff fast path: a warm sweep is one tuple hash per file against
+    # this set, instead of a row lookup plus field compares
+    unchanged = {(row["path"], row["mtime_ns"], row["size"]) for row in rows}
+
+    to_hash: List[tuple] = []  # (Path, os.stat_result, row)
+    for file_path, st in candidates:
+        path_str = str(file_path)
+        # When mtime and size match what we stored at index time the
+        # content cannot have changed, so no bytes get hashed
+        if (path_str, st.st_mtime_ns, st.st_size) in unchanged:
+            continue
+
+        row = state_by_path.get(path_str)
+        if not row:
+            # New file
+            changed_files.append(file_path)
+            continue
+
+        # Metadata differs; hash to be sure
+        to_hash.append((file_path, st, row))
+
+    # Hash candidates concurrently: the digest releases the GIL, so worker
+    # threads overlap both the hashing and the disk reads across files
+    metadata_refresh: List[tuple] = []  # (mtime_ns, size, file_id)
+    if to_hash:
+        semaphore = asyncio.Semaphore((os.cpu_count() or 4) * 2)
+
+        async def hash_one(path: Path) -> str:
+            async with semaphore:
+                return await asyncio.to_thread(calculate_file_hash, path)
+
+        hashes = await asyncio.gather(
+            *(hash_one(file_path) for file_path, _, _ in to_hash),
+            return_exceptions=True
+        )
+        for (file_path, st, row), content_hash in zip(to_hash, hashes):
+            if isinstance(content_hash, Exception):
+                print(f"Could not hash {file_path}: {content_hash}")
+                continue
+            if row["content_hash"] != content_hash:
+                # Modified file
+                changed_files.append(file_path)
+            else:
+                # Touched but unchanged (e.g. checkout); refresh the
+                # metadata so the next sweep skips the hash again
+                metadata_refresh.append((st.st_mtime_ns, st.st_size, row["id"]))
+
+    if metadata_refresh:
+        async with db_pool.acquire() as conn:
+            await conn.executemany(
+                "UPDATE files SET mtime_ns = $1, size = $2 WHERE id = $3",
+                metadata_refresh
+            )
     
     if changed_files:
         print(f"Found {len(changed_files)} changed files, starting incremental indexing...")
@@ -1203,12 +1728,12 @@ async def check_for_changes():
         print("No changes detected")
 
 def calculate_file_hash(file_path: Path) -> str:
-    """Calculate SHA256 hash of file content"""
-    sha256 = hashlib.sha256()
+    """Calculate the change-detection hash of file content"""
+    # Shares the digest algorithm with the indexer so the monitor's
+    # comparison against files.content_hash stays consistent
+    from indexer import content_hash
     with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b''):
-            sha256.update(chunk)
-    return sha256.hexdigest()
+        return content_hash(f.read())
 
 async def initial_indexing():
     """Initial indexing of all files"""
@@ -1226,26 +1751,27 @@ async def initial_indexing():
             add_log_entry(f"⚠️ Path does not exist: {base_path}")
             continue
         
-        for ext in ["*.cpp", "*.cc", "*.cxx", "*.hpp", "*.h", "*.hxx"]:
-            all_files.extend(base_path.rglob(ext))
+        all_files.extend(Path(entry.path) for entry in _iter_cpp_files(base_path))
     
     indexing_status["total_files"] = len(all_files)
     print(f"Found {len(all_files)} C++ files to index")
     add_log_entry(f"📊 Found {len(all_files)} C++ files to index")
     
-    # Index files one by one for better logging
-    for i, file_path in enumerate(all_files):
-        indexing_status["current_file"] = str(file_path)
-        await index_files([file_path])
-        indexing_status["indexed_files"] = i + 1
-        
-        # Add log entry for each file
-        short_path = str(file_path).replace('/host/', '')
-        add_log_entry(f"✓ Indexed {short_path}")
-        
-        # Progress message every 10 files
-        if (i + 1) % 10 == 0:
-            print(f"Indexed {i + 1}/{len(all_files)} files")
+    # Index in sizeable batches: batch_index_files keeps 16 files in
+    # flight per call and bulk-loads entities/chunks via COPY, so
+    # feeding it one file at a time wasted the batching entirely
+    batch_size = 100
+    for start in range(0, len(all_files), batch_size):
+        batch = all_files[start:start + batch_size]
+        indexing_status["current_file"] = str(batch[0])
+        await index_files(batch)
+        done = min(start + batch_size, len(all_files))
+        indexing_status["indexed_files"] = done
+
+        # Add log entry per batch
+        short_path = str(batch[0]).replace('/host/', '')
+        add_log_entry(f"✓ Indexed {len(batch)} files from {short_path} ({done}/{len(all_files)})")
+        print(f"Indexed {done}/{len(all_files)} files")
     
     print(f"Indexing complete: {len(all_files)} files")
     add_log_entry(f"🎉 Indexing complete! Processed {len(all_files)} files")
@@ -1257,6 +1783,8 @@ async def index_files(file_paths: List[Path]):
     """Index a batch of files using the enhanced indexer"""
     from indexer import batch_index_files
     await batch_index_files(file_paths, db_pool, embedding_model)
+    # Entity line ranges may have moved; drop cached location lookups
+    _LOC_CACHE.clear()
 
 if __name__ == "__main__":
     import uvicorn
@@ -7,10 +7,115 @@ Designed for the real debugging workflow:
 3. Provides context to LLM for root cause analysis
 """
 
+import asyncio
+import io
+from collections import OrderedDict, deque
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import re
 
+import numpy as np
+
+# Compiled once so the hot per-line/per-frame loops skip re's pattern
+# cache lookup on every call
+_FRAME_RE = re.compile(r'([^!]+)!(.+?)\((.*?)\)\s+Line\s+(\d+)')
+_FRAME_FILE_RE = re.compile(r'\[(.+?\.(?:cpp|cc|cxx|h|hpp))\s*@\s*\d+\]')
+_FRAME_SIMPLE_RE = re.compile(r'([^!]+)!(.+)')
+_STATE_RE = re.compile(r'(\w+)\s*[=:]\s*([^\s,;]+)')
+
+# Marker alternations matched in a single pass per line instead of one
+# substring scan per marker
+_ERROR_MARKERS_RE = re.compile(r'error|exception|fatal|critical')
+_WARN_MARKERS_RE = re.compile(r'warn')
+_STATE_VAR_RE = re.compile(r'count|size|ptr|handle|connection')
+_EXC_MARKER_RE = re.compile(r'access violation|0x00000000|0xdddddddd|0xfeeefeee|stack')
+_POOL_MARKER_RE = re.compile(r'pool|exhausted')
+
+# Crash analyses for the same exception repeat across LLM turns; cache the
+# query embeddings so only new exception texts hit the model
+_EMBED_CACHE_MAX = 512
+_embed_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+# Hoisted so the pool's statement cache reuses one prepared plan; the
+# embedding travels in binary through the registered pgvector codec.
+# The distance threshold (similarity > 0.3) lives in SQL so rows below
+# it are never serialized, shipped or post-filtered
+_SIMILAR_SQL = """
+    SELECT
+        c.content,
+        f.path as file_path,
+        e.qualified_name,
+        c.start_line,
+        1 - (c.embedding <=> $1) as similarity
+    FROM code_chunks c
+    JOIN files f ON c.file_id = f.id
+    LEFT JOIN entities e ON c.entity_id = e.id
+    WHERE c.embedding IS NOT NULL
+      AND (c.embedding <=> $1) < 0.7
+    ORDER BY c.embedding <=> $1
+    LIMIT 5
+"""
+
+
+# All of a stack's (file, line) frames resolved in one round trip: the
+# hint arrays are unnested and each row picks its smallest enclosing
+# entity via LATERAL, preserving frame order through the ordinality
+_FRAMES_SQL = """
+    SELECT
+        hit.qualified_name,
+        hit.type,
+        hit.signature,
+        hit.start_line,
+        hit.end_line,
+        hit.file_path,
+        hit.code
+    FROM unnest($1::text[], $2::text[], $3::int[])
+        WITH ORDINALITY AS v(name_pat, path_pat, line, ord)
+    LEFT JOIN LATERAL (
+        SELECT
+            e.qualified_name,
+            e.type,
+            e.signature,
+            e.start_line,
+            e.end_line,
+            f.path as file_path,
+            c.content as code
+        FROM entities e
+        JOIN files f ON e.file_id = f.id
+        LEFT JOIN code_chunks c ON c.entity_id = e.id
+        WHERE (f.path_posix LIKE v.name_pat OR f.path_posix LIKE v.path_pat)
+          AND e.start_line <= v.line
+          AND e.end_line >= v.line
+        ORDER BY (e.end_line - e.start_line) ASC
+        LIMIT 1
+    ) hit ON TRUE
+    ORDER BY v.ord
+"""
+
+
+async def _encode_cached(embedding_model, text: str) -> np.ndarray:
+    """Encode in a worker thread, memoizing recent texts.
+
+    Goes through the server's shared micro-batching encoder when
+    available, so crash analyses coalesce with concurrent search encodes
+    into one model pass instead of paying a forward pass each.
+    """
+    cached = _embed_cache.get(text)
+    if cached is not None:
+        _embed_cache.move_to_end(text)
+        return cached
+    try:
+        from server import _query_encoder
+        embedding = await _query_encoder.encode(text)
+    except ImportError:
+        # Standalone use without the server module; still off-loop
+        embedding = await asyncio.to_thread(embedding_model.encode, text)
+        embedding = np.asarray(embedding, dtype=np.float32)
+    if len(_embed_cache) >= _EMBED_CACHE_MAX:
+        _embed_cache.popitem(last=False)
+    _embed_cache[text] = embedding
+    return embedding
+
 
 class VSDebugContext:
     """Represents debugging context from Visual Studio"""
@@ -92,24 +197,52 @@ async def analyze_vs_debug_context(
                 "exception": exception_info
             }
         
-        # 2. Parse call stack and get code for each frame
+        # 2. Parse call stack and get code for each frame. Frames with a
+        # (file, line) hint are resolved in one fused round trip; the
+        # rarer function-name-only frames run concurrently on their own
+        # pooled connections under a semaphore
         parsed_stack = _parse_vs_call_stack(call_stack)
-        
-        for frame in parsed_stack:
-            frame_code = None
-            
-            # Try to find by file and line
+        frame_codes: List[Optional[Dict]] = [None] * len(parsed_stack)
+
+        loc_frames = []
+        func_frames = []
+        for idx, frame in enumerate(parsed_stack):
             if frame.get("file") and frame.get("line"):
-                frame_code = await _get_code_at_location(
-                    conn, frame["file"], frame["line"]
-                )
-            
-            # Try to find by function name
+                loc_frames.append((idx, frame))
             elif frame.get("function"):
-                frame_code = await _find_by_function_name(
-                    conn, frame["function"]
-                )
-            
+                func_frames.append((idx, frame))
+
+        if loc_frames:
+            name_patterns = []
+            path_patterns = []
+            frame_lines = []
+            for _, frame in loc_frames:
+                name_patterns.append(f"%{Path(frame['file']).name}%")
+                path_patterns.append(f"%{Path(frame['file']).as_posix()}%")
+                frame_lines.append(frame["line"])
+            rows = await conn.fetch(
+                _FRAMES_SQL, name_patterns, path_patterns, frame_lines)
+            for (idx, _), row in zip(loc_frames, rows):
+                if row["qualified_name"] is not None:
+                    frame_codes[idx] = dict(row)
+
+        if func_frames:
+            frame_semaphore = asyncio.Semaphore(10)
+
+            async def lookup_by_function(frame: Dict[str, Any]) -> Optional[Dict]:
+                async with frame_semaphore:
+                    async with db_pool.acquire() as frame_conn:
+                        return await _find_by_function_name(
+                            frame_conn, frame["function"]
+                        )
+
+            func_codes = await asyncio.gather(
+                *(lookup_by_function(frame) for _, frame in func_frames)
+            )
+            for (idx, _), frame_code in zip(func_frames, func_codes):
+                frame_codes[idx] = frame_code
+
+        for frame, frame_code in zip(parsed_stack, frame_codes):
             if frame_code:
                 analysis["execution_path"].append({
                     "frame_info": frame,
@@ -131,24 +264,12 @@ async def analyze_vs_debug_context(
         
         # 4. Search for similar crash patterns using exception info
         if exception_info:
-            query_embedding = embedding_model.encode(
+            query_embedding = await _encode_cached(
+                embedding_model,
                 f"crash {exception_info} {crash_code.get('qualified_name', '') if crash_code else ''}"
-            ).tolist()
-            
-            similar = await conn.fetch("""
-                SELECT 
-                    c.content,
-                    f.path as file_path,
-                    e.qualified_name,
-                    c.start_line,
-                    1 - (c.embedding <=> $1::vector) as similarity
-                FROM code_chunks c
-                JOIN files f ON c.file_id = f.id
-                LEFT JOIN entities e ON c.entity_id = e.id
-                WHERE c.embedding IS NOT NULL
-                ORDER BY c.embedding <=> $1::vector
-                LIMIT 5
-            """, query_embedding)
+            )
+
+            similar = await conn.fetch(_SIMILAR_SQL, query_embedding)
             
             analysis["similar_patterns"] = [
                 {
@@ -159,7 +280,6 @@ async def analyze_vs_debug_context(
                     "line": row["start_line"]
                 }
                 for row in similar
-                if float(row["similarity"]) > 0.3  # Only reasonably similar
             ]
         
         # 5. Build root cause hypothesis
@@ -173,31 +293,74 @@ async def analyze_vs_debug_context(
     return analysis
 
 
+# Hoisted like _SIMILAR_SQL: stable statement text means the pool's
+# per-connection statement cache serves one prepared plan for every
+# frame of a stack instead of re-parsing per call
+_LOC_SQL = """
+    SELECT
+        e.qualified_name,
+        e.type,
+        e.signature,
+        e.start_line,
+        e.end_line,
+        f.path as file_path,
+        c.content as code
+    FROM entities e
+    JOIN files f ON e.file_id = f.id
+    LEFT JOIN code_chunks c ON c.entity_id = e.id
+    WHERE (f.path_posix LIKE $1 OR f.path_posix LIKE $2)
+      AND e.start_line <= $3
+      AND e.end_line >= $3
+    ORDER BY (e.end_line - e.start_line) ASC
+    LIMIT 1
+"""
+
+# Exact simple-name lookup first (BTree); the substring fallback only
+# fires when that finds nothing, served by the trigram index
+_FIND_FUNC_SQL = """
+    SELECT
+        e.qualified_name,
+        e.type,
+        e.signature,
+        e.start_line,
+        e.end_line,
+        f.path as file_path,
+        c.content as code
+    FROM entities e
+    JOIN files f ON e.file_id = f.id
+    LEFT JOIN code_chunks c ON c.entity_id = e.id
+    WHERE e.simple_name = $1
+    ORDER BY LENGTH(e.qualified_name) ASC
+    LIMIT 1
+"""
+
+_FIND_FUNC_FALLBACK_SQL = """
+    SELECT
+        e.qualified_name,
+        e.type,
+        e.signature,
+        e.start_line,
+        e.end_line,
+        f.path as file_path,
+        c.content as code
+    FROM entities e
+    JOIN files f ON e.file_id = f.id
+    LEFT JOIN code_chunks c ON c.entity_id = e.id
+    WHERE e.qualified_name LIKE $1
+    ORDER BY LENGTH(e.qualified_name) ASC
+    LIMIT 1
+"""
+
+
 async def _get_code_at_location(conn, file_path: str, line_number: int) -> Optional[Dict]:
     """Get code entity at specific location"""
     # Normalize path (handle both forward and backslashes)
     normalized_path = Path(file_path).as_posix()
     file_name = Path(file_path).name
-    
-    result = await conn.fetchrow("""
-        SELECT 
-            e.qualified_name,
-            e.type,
-            e.signature,
-            e.start_line,
-            e.end_line,
-            f.path as file_path,
-            c.content as code
-        FROM entities e
-        JOIN files f ON e.file_id = f.id
-        LEFT JOIN code_chunks c ON c.entity_id = e.id
-        WHERE (f.path LIKE $1 OR f.path LIKE $2)
-          AND e.start_line <= $3 
-          AND e.end_line >= $3
-        ORDER BY (e.end_line - e.start_line) ASC
-        LIMIT 1
-    """, f"%{file_name}%", f"%{normalized_path}%", line_number)
-    
+
+    result = await conn.fetchrow(
+        _LOC_SQL, f"%{file_name}%", f"%{normalized_path}%", line_number)
+
     return dict(result) if result else None
 
 
@@ -205,25 +368,11 @@ async def _find_by_function_name(conn, function_name: str) -> Optional[Dict]:
     """Find code by function name (fallback)"""
     # Clean up function name (remove parameters, etc.)
     clean_name = function_name.split('(')[0].strip()
-    
-    result = await conn.fetchrow("""
-        SELECT 
-            e.qualified_name,
-            e.type,
-            e.signature,
-            e.start_line,
-            e.end_line,
-            f.path as file_path,
-            c.content as code
-        FROM entities e
-        JOIN files f ON e.file_id = f.id
-        LEFT JOIN code_chunks c ON c.entity_id = e.id
-        WHERE e.qualified_name LIKE $1
-           OR e.simple_name = $2
-        ORDER BY LENGTH(e.qualified_name) ASC
-        LIMIT 1
-    """, f"%{clean_name}%", clean_name.split('::')[-1])
-    
+
+    result = await conn.fetchrow(_FIND_FUNC_SQL, clean_name.split('::')[-1])
+    if result is None:
+        result = await conn.fetchrow(_FIND_FUNC_FALLBACK_SQL, f"%{clean_name}%")
+
     return dict(result) if result else None
 
 
@@ -247,11 +396,8 @@ def _parse_vs_call_stack(call_stack: List[str]) -> List[Dict[str, Any]]:
         frame = {"raw": line}
         
         # Pattern: module!namespace::class::function(params) Line XX
-        match = re.search(
-            r'([^!]+)!(.+?)\((.*?)\)\s+Line\s+(\d+)',
-            line
-        )
-        
+        match = _FRAME_RE.search(line)
+
         if match:
             frame["module"] = match.group(1)
             frame["function"] = match.group(2)
@@ -260,12 +406,12 @@ def _parse_vs_call_stack(call_stack: List[str]) -> List[Dict[str, Any]]:
             
             # Try to extract file from later in the line
             # Format: ... C++ [path\to\file.cpp @ 95]
-            file_match = re.search(r'\[(.+?\.(?:cpp|cc|cxx|h|hpp))\s*@\s*\d+\]', line)
+            file_match = _FRAME_FILE_RE.search(line)
             if file_match:
                 frame["file"] = file_match.group(1)
         else:
             # Simpler pattern without line number
-            match = re.search(r'([^!]+)!(.+)', line)
+            match = _FRAME_SIMPLE_RE.search(line)
             if match:
                 frame["module"] = match.group(1)
                 frame["function"] = match.group(2).split('(')[0]
@@ -290,12 +436,12 @@ def _analyze_logs(
     - Related error messages
     - State information
     """
-    lines = log_content.split('\n')
-    
+    # Bounded deques keep only the most recent entries in O(1) per append,
+    # so long logs never build up large intermediate lists
     analysis = {
-        "errors_before_crash": [],
-        "warnings_before_crash": [],
-        "relevant_entries": [],
+        "errors_before_crash": deque(maxlen=20),
+        "warnings_before_crash": deque(maxlen=20),
+        "relevant_entries": deque(maxlen=30),
         "state_info": {}
     }
     
@@ -315,47 +461,53 @@ def _analyze_logs(
     
     # Remove common words
     keywords -= {"the", "a", "an", "at", "in", "on", "line", "c++"}
-    
-    # Scan logs
-    for i, line in enumerate(lines):
+
+    # One compiled alternation matches every dynamic keyword in a single
+    # scan per line instead of a substring pass per keyword
+    keywords_re = re.compile(
+        "|".join(map(re.escape, keywords))) if keywords else None
+
+    # Scan logs, streaming line by line so the whole log is never
+    # materialized as a second copy in a list
+    for i, line in enumerate(io.StringIO(log_content)):
         line_lower = line.lower()
-        
+
         # Check for errors
-        if any(err in line_lower for err in ["error", "exception", "fatal", "critical"]):
+        if _ERROR_MARKERS_RE.search(line_lower):
             analysis["errors_before_crash"].append({
                 "line_number": i + 1,
                 "content": line.strip()
             })
-        
+
         # Check for warnings
-        elif any(warn in line_lower for warn in ["warning", "warn"]):
+        elif _WARN_MARKERS_RE.search(line_lower):
             analysis["warnings_before_crash"].append({
                 "line_number": i + 1,
                 "content": line.strip()
             })
-        
+
         # Check for relevant keywords
-        if any(keyword in line_lower for keyword in keywords):
+        if keywords_re is not None and keywords_re.search(line_lower):
             analysis["relevant_entries"].append({
                 "line_number": i + 1,
                 "content": line.strip()
             })
-        
+
         # Extract state info (variable = value patterns)
-        state_match = re.search(r'(\w+)\s*[=:]\s*([^\s,;]+)', line)
+        state_match = _STATE_RE.search(line)
         if state_match:
             var_name = state_match.group(1)
             var_value = state_match.group(2)
-            
+
             # Filter interesting variables
-            if any(word in var_name.lower() for word in ["count", "size", "ptr", "handle", "connection"]):
+            if _STATE_VAR_RE.search(var_name.lower()):
                 analysis["state_info"][var_name] = var_value
     
-    # Keep only last 20 errors/warnings (most recent)
-    analysis["errors_before_crash"] = analysis["errors_before_crash"][-20:]
-    analysis["warnings_before_crash"] = analysis["warnings_before_crash"][-20:]
-    analysis["relevant_entries"] = analysis["relevant_entries"][-30:]
-    
+    # Convert the bounded tails back to plain lists for the JSON response
+    analysis["errors_before_crash"] = list(analysis["errors_before_crash"])
+    analysis["warnings_before_crash"] = list(analysis["warnings_before_crash"])
+    analysis["relevant_entries"] = list(analysis["relevant_entries"])
+
     return analysis
 
 
@@ -371,9 +523,12 @@ def _build_root_cause_hypothesis(
     Returns list of hypotheses with reasoning
     """
     hypotheses = []
-    
+
+    # One pass over the exception text instead of one lowercase+scan per marker
+    markers = set(_EXC_MARKER_RE.findall((exception_info or "").lower()))
+
     # Hypothesis 1: Null pointer from exception type
-    if "access violation" in exception_info.lower() or "0x00000000" in exception_info:
+    if "access violation" in markers or "0x00000000" in markers:
         hypotheses.append({
             "hypothesis": "Null pointer dereference",
             "reasoning": f"Exception '{exception_info}' indicates null pointer access",
@@ -382,7 +537,7 @@ def _build_root_cause_hypothesis(
         })
     
     # Hypothesis 2: Object already deleted (use-after-free)
-    if "0xdddddddd" in exception_info.lower() or "0xfeeefeee" in exception_info.lower():
+    if "0xdddddddd" in markers or "0xfeeefeee" in markers:
         hypotheses.append({
             "hypothesis": "Use-after-free (accessing deleted object)",
             "reasoning": "Memory pattern suggests freed/deleted memory",
@@ -391,7 +546,7 @@ def _build_root_cause_hypothesis(
         })
     
     # Hypothesis 3: Stack corruption
-    if "stack" in exception_info.lower() or len(execution_path) > 100:
+    if "stack" in markers or len(execution_path) > 100:
         hypotheses.append({
             "hypothesis": "Stack overflow or corruption",
             "reasoning": f"Deep call stack ({len(execution_path)} frames) or stack-related exception",
@@ -410,7 +565,7 @@ def _build_root_cause_hypothesis(
         })
     
     # Hypothesis 5: Resource exhaustion
-    if log_analysis and any("pool" in entry["content"].lower() or "exhausted" in entry["content"].lower() 
+    if log_analysis and any(_POOL_MARKER_RE.search(entry["content"].lower())
                             for entry in log_analysis.get("relevant_entries", [])):
         hypotheses.append({
             "hypothesis": "Resource pool exhausted",